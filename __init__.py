@@ -2,7 +2,12 @@
 
 from .utils import *
 from .gui import *
-from .map import Tileset, Map
+from .map import Tileset, Map, MapLoader, TILESETS, EVENTS
 from .entity import Player
 from .camera import Camera
+from .renderer import WorldRenderer
+from .collision import BlockIndex, CollisionGrid
+from .pathfinding import Pathfinder, FlowField, FlowFieldCache
+from .atlas import Atlas
+from .hotreload import HotReload
 from .input import *
@@ -0,0 +1,258 @@
+from .utils import (
+    PATH,
+    validateDict,
+    loadCache,
+    saveCache
+)
+import pygame as pg
+import numpy as np
+import os
+
+class Atlas:
+    """
+    packs tile images, entity frames and gui images into a few big pages.
+    the packed objects get subsurfaces of these pages as their images, so
+    everything drawn comes from the same few sources. tiles no map uses are
+    left out. the pages are kept in a compiled cache file and only repacked
+    when one of the packed sources changes. usage:
+    atlas = Atlas("world")
+    atlas.addMap(map)
+    atlas.addEntity(player)
+    button = atlas.addImage(PATH["interface"] + "\\button.png")
+    atlas.save()
+    """
+    default = {
+        "size": (1024, 1024),
+        "cache": True
+    }
+    def __init__(self, name, config={}):
+        """
+        'name' name of the cache file in the 'atlases' asset folder.
+        'options' validated dict of properties.
+            'size' size of a single page. images bigger than that get a page
+                of their own.
+            'cache' if 'true' the pages are loaded from and saved to a
+                compiled cache file.
+        'cachepath' path to the compiled cache file.
+        'pages' list of surfaces all images are packed into.
+        'shelves' list of rows per page. each row is a list of
+            [top, height, used width].
+        'bottoms' the lowest used pixel row of each page.
+        'regions' dict of (page, rect) by the key of each packed image.
+        'sources' set of file paths the packed images come from.
+        'changed' 'true' if something has been packed since loading.
+        """
+        self.name = name# str
+        self.options = validateDict(config, self.default)# dict
+        self.cachepath = PATH["atlases"] + "\\" + name + ".npz"# str
+        self.pages = []# list
+        self.shelves = []# list
+        self.bottoms = []# list
+        self.regions = {}# dict
+        self.sources = set()# set
+        self.changed = False# bool
+        if self.options["cache"]:
+            cache = loadCache(self.cachepath)# dict / none
+            if cache:
+                self.__readCache(cache)
+    def __len__(self):# int
+        """return the number of packed images."""
+        return len(self.regions)
+    def __contains__(self, key):# bool
+        """return 'true' if an image with that key is packed."""
+        return key in self.regions
+    def __createPage(self, size):# int
+        """append an empty page and return its index."""
+        page = pg.Surface(size, pg.SRCALPHA)
+        if pg.display.get_init() and pg.display.get_surface():
+            page = page.convert_alpha()
+        self.pages.append(page)
+        self.shelves.append([])
+        self.bottoms.append(0)
+
+        return len(self.pages) - 1
+    def __readCache(self, cache):
+        """restore pages and regions from a compiled cache."""
+        for i in range(int(cache["pagecount"])):
+            pixels = cache["page_" + str(i)]
+            page = self.__createPage((pixels.shape[1], pixels.shape[0]))
+            self.pages[page].blit(
+                pg.image.frombytes(
+                    pixels.tobytes(),
+                    (pixels.shape[1], pixels.shape[0]),
+                    "RGBA"
+                ),
+                (0, 0)
+            )
+        regions = zip(cache["keys"].tolist(), cache["rects"].tolist())
+
+        for key, region in regions:
+            page, rect = region[0], pg.Rect(region[1:])
+            self.regions[key] = (page, rect)
+            self.bottoms[page] = max(self.bottoms[page], rect.bottom)
+        self.sources = set(cache["files"].tolist())
+    def __place(self, size):# tuple
+        """
+        find room for an image of that size and return (page, rect). rows of
+        the page are filled from left to right. new rows are opened below
+        the lowest one, new pages as soon as a page is full.
+        """
+        w, h = size
+        pw, ph = self.options["size"]
+
+        for page in range(len(self.pages)):
+            width, height = self.pages[page].get_size()
+            # taking the flattest row the image fits in
+            fitting = [
+                shelf for shelf in self.shelves[page]
+                if shelf[1] >= h and shelf[2] + w <= width
+            ]
+            if fitting:
+                shelf = min(fitting, key=lambda shelf: shelf[1])
+                rect = pg.Rect(shelf[2], shelf[0], w, h)
+                shelf[2] += w
+                return page, rect
+            if self.bottoms[page] + h <= height and w <= width:
+                self.shelves[page].append([self.bottoms[page], h, w])
+                rect = pg.Rect(0, self.bottoms[page], w, h)
+                self.bottoms[page] += h
+                return page, rect
+        # oversized images get a page of their own
+        page = self.__createPage((max(w, pw), max(h, ph)))
+        self.shelves[page].append([0, h, w])
+        self.bottoms[page] = h
+
+        return page, pg.Rect(0, 0, w, h)
+    def getImage(self, key):# pygame.surface / none
+        """return the packed image with that key or 'none'."""
+        if key not in self.regions:
+            return None
+        page, rect = self.regions[key]
+
+        return self.pages[page].subsurface(rect)
+    def pack(self, images):# dict
+        """
+        pack a dict of images by their keys and return a dict of their packed
+        subsurfaces. images already packed aren't packed again. the highest
+        images are packed first, so the rows waste less space.
+        """
+        missing = sorted(
+            [key for key in images if key not in self.regions],
+            key=lambda key: images[key].get_height(),
+            reverse=True
+        )
+
+        for key in missing:
+            page, rect = self.__place(images[key].get_size())
+            self.pages[page].fill((0, 0, 0, 0), rect)
+            self.pages[page].blit(images[key], rect)
+            self.regions[key] = (page, rect)
+            self.changed = True
+
+        return {key: self.getImage(key) for key in images}
+    def addImage(self, path):# pygame.surface
+        """pack an image file and return its packed subsurface."""
+        key = "image:" + path
+        self.sources.add(path)
+        if key in self.regions:
+            return self.getImage(key)
+
+        return self.pack({key: pg.image.load(path)})[key]
+    def addTileset(self, tileset, used=None):
+        """
+        pack the frames of a tileset and replace them by their packed
+        subsurfaces. 'used' list of tile ids to pack. every other frame
+        stays as it is. all frames are packed if it's 'none'.
+        """
+        if used is None:
+            used = range(len(tileset.frames))
+        key = "tileset:" + tileset.name + ":"
+        packed = self.pack({
+            key + str(id): tileset.frames[id]
+            for id in used
+        })
+
+        for id in used:
+            tileset.frames[id] = packed[key + str(id)]
+        # flipped tiles are transformed from the new frames again
+        tileset.transformed = {}
+        self.sources.update(tileset.sources)
+    def addMap(self, map):
+        """
+        pack every tile the map places on its tile layers and refresh the
+        map's tile table. tiles that aren't used are left out.
+        """
+        used = map.getUsedTiles()
+
+        for firstgid, tileset in zip(map.tiles.firstgids, map.tiles.tilesets):
+            ids = np.nonzero(used[firstgid:firstgid + len(tileset)])[0]
+            self.addTileset(tileset, ids.tolist())
+        map.tiles.refresh()
+        self.sources.add(map.config["path"])
+    def addEntity(self, entity):
+        """
+        pack the frames of an entity and replace them in its frame list and
+        every animation by their packed subsurfaces.
+        """
+        key = "entity:" + entity.name + ":"
+        packed = self.pack({
+            key + str(i): frame
+            for i, frame in enumerate(entity.frames)
+        })
+        # old and new frames by the old one's id, so the animations' copies
+        # can be found. the old frames are kept alive until all are replaced
+        frames = {
+            id(frame): (frame, packed[key + str(i)])
+            for i, frame in enumerate(entity.frames)
+        }
+
+        def remap(frame):
+            return frames[id(frame)][1] if id(frame) in frames else frame
+
+        entity.frames[:] = [remap(each) for each in entity.frames]
+        for _, animation in entity.animations.items():
+            animation.frames = [remap(each) for each in animation.frames]
+            animation.image = animation.frames[animation.pointer]
+        entity.image = remap(entity.image)
+        entity.zoomed = {}
+        self.sources.add(
+            entity.config["filepath"] + "\\" + entity.config["image"]
+        )
+    def save(self):
+        """
+        write the pages and regions to the compiled cache file if anything
+        has been packed since loading. the 'atlases' asset folder is created
+        if there is none yet.
+        """
+        if not self.options["cache"] or not self.changed:
+            return
+        # fresh projects don't have the folder
+        try:
+            os.makedirs(PATH["atlases"], exist_ok=True)
+        except OSError:
+            pass
+        keys = list(self.regions)
+        arrays = {
+            "page_" + str(i): np.frombuffer(
+                pg.image.tobytes(page, "RGBA"),
+                dtype=np.uint8
+            ).reshape(page.get_height(), page.get_width(), 4)
+            for i, page in enumerate(self.pages)
+        }
+
+        saveCache(
+            self.cachepath,
+            sorted(self.sources),
+            pagecount=np.array(len(self.pages)),
+            keys=np.array(keys, dtype=str),
+            rects=np.array(
+                [
+                    (self.regions[key][0],) + tuple(self.regions[key][1])
+                    for key in keys
+                ],
+                dtype=np.int32
+            ).reshape(-1, 5),
+            files=np.array(sorted(self.sources), dtype=str),
+            **arrays
+        )
+        self.changed = False
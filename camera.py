@@ -20,7 +20,9 @@ class Camera(pg.Rect):
         'config' validated dict of properties to feed the camera with.
         'tracking' possible tracking of an entity. the camera then recalculates
             its position in the 'update()'-method.
-        'zoomfactor' right now is only a placeholder for upcoming changes.
+        'zoomfactor' int of the zoom level. the map and entities are drawn
+            that many times bigger. the camera size stays the same, so it
+            shows less of the map.
         'anchors' is used for quick-pointing a part of the rect. for example:
             draw(object, self, self.anchors["midcenter"]).
         """
@@ -33,11 +35,39 @@ class Camera(pg.Rect):
         self.zoomfactor = self.config["zoom"]# int
         # sizing
         self.anchors = getAnchors(self.size)# dict
+    @property# pygame.rect
+    def viewport(self):
+        """
+        return the area of the map that is visible through the camera. the
+        camera's position is the negative offset the map is drawn with. the
+        more the camera zooms in, the smaller the area gets.
+        """
+        return pg.Rect(
+            (-self.left, -self.top),
+            (
+                -(-self.width // self.zoomfactor),
+                -(-self.height // self.zoomfactor)
+            )
+        )
+    def getScreenRect(self, rect):# pygame.rect
+        """
+        return where a rect in map coordinates is drawn on the screen. use it
+        to draw entities with the camera's offset and zoom. example:
+        draw(player.getZoomedImage(camera.zoomfactor), display,
+            camera.getScreenRect(player.rect))
+        """
+        return pg.Rect(
+            (rect[0] + self.left) * self.zoomfactor,
+            (rect[1] + self.top) * self.zoomfactor,
+            rect[2] * self.zoomfactor,
+            rect[3] * self.zoomfactor
+        )
     def update(self):
         """updating rect on each game loop."""
         if self.tracking:
-            self.left = -(self.tracking.rect.center[0] - int(self.width / 2))
-            self.top = -(self.tracking.rect.center[1] - int(self.height / 2))
+            view = self.viewport
+            self.left = -(self.tracking.rect.center[0] - int(view.width / 2))
+            self.top = -(self.tracking.rect.center[1] - int(view.height / 2))
     def zoom(self, factor):
         """
         change the zoomfactor of the camera rect. doesnt change the camera size.
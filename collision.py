@@ -0,0 +1,385 @@
+from .utils import COLLISIONS
+import pygame as pg
+import numpy as np
+import math
+
+class BlockIndex:
+    """
+    spatial hash for block rects. every rect is stored in each grid cell it
+    covers. collision checks then only have to look at the cells under a
+    given rect instead of every block on the map. usage:
+    index = BlockIndex(map.blocks, map.tilesize)
+    for block in index.query(entity.collisionbox):
+        ...
+    """
+    def __init__(self, blocks=[], cellsize=(32, 32)):
+        """
+        'cellsize' size of a single grid cell. using the maps tilesize works
+            best.
+        'cells' dict of lists with all rects in that cell. the cell position
+            (x, y) is the key.
+        'rects' dict of lists with all rects equal to a (x, y, w, h) tuple.
+            it's the key.
+        'count' number of rects in this index.
+        """
+        self.cellsize = tuple(cellsize)# tuple
+        self.cells = {}# dict
+        self.rects = {}# dict
+        self.count = 0# int
+        for block in blocks:
+            self.add(block)
+    def __len__(self):# int
+        """return the number of rects in this index."""
+        return self.count
+    def __contains__(self, rect):# bool
+        """return 'true' if a rect equal to 'rect' is in this index."""
+        return tuple(rect) in self.rects
+    def __iter__(self):
+        """iterate over every rect in this index exactly once."""
+        for _, rects in self.rects.items():
+            for rect in rects:
+                yield rect
+    def __getCells(self, rect):# list
+        """return a list of every cell position the rect covers."""
+        w, h = self.cellsize
+        left = rect.left // w
+        top = rect.top // h
+        right = (rect.right - 1) // w
+        bottom = (rect.bottom - 1) // h
+
+        return [
+            (x, y)
+            for y in range(top, bottom + 1)
+            for x in range(left, right + 1)
+        ]
+    def add(self, rect):
+        """add a block rect to every cell it covers."""
+        for cell in self.__getCells(rect):
+            if cell in self.cells:
+                self.cells[cell].append(rect)
+            else:
+                self.cells[cell] = [rect]
+        key = tuple(rect)
+        if key in self.rects:
+            self.rects[key].append(rect)
+        else:
+            self.rects[key] = [rect]
+        self.count += 1
+    def remove(self, rect):# pygame.rect / none
+        """
+        remove a block rect equal to 'rect' from every cell it covers and
+        return the removed rect. rects that aren't in this index are ignored
+        and 'none' is returned.
+        """
+        key = tuple(rect)
+        if key not in self.rects:
+            return None
+        rect = self.rects[key].pop()
+        if not self.rects[key]:
+            del self.rects[key]
+        for cell in self.__getCells(rect):
+            blocks = self.cells[cell]
+            # removing this very rect, not just an equal one
+            for i, each in enumerate(blocks):
+                if each is rect:
+                    del blocks[i]
+                    break
+            # dropping empty cells to keep the dict small
+            if not blocks:
+                del self.cells[cell]
+        self.count -= 1
+
+        return rect
+    def clear(self):
+        """remove every rect from this index."""
+        self.cells = {}
+        self.rects = {}
+        self.count = 0
+    def query(self, rect):# list
+        """
+        return a list of every block rect stored in the cells under 'rect'.
+        each rect appears only once, even if it covers multiple cells.
+        """
+        blocks = []
+        seen = set()
+
+        for cell in self.__getCells(rect):
+            if cell in self.cells:
+                for block in self.cells[cell]:
+                    if id(block) not in seen:
+                        seen.add(id(block))
+                        blocks.append(block)
+
+        return blocks
+class CollisionGrid:
+    """
+    per cell collision bits of a map. each cell holds the categories of the
+    tiles placed on it as bits (see 'COLLISIONS'), so asking whether a cell
+    is blocked is a single array lookup. cells outside of the grid are never
+    blocked. usage:
+    if not map.collision.isBlocked((x, y), "water"):
+        ...
+    if map.collision.collides(entity.collisionbox):
+        ...
+    if map.collision.isVisible(guard.rect.center, player.rect.center):
+        ...
+    """
+    def __init__(self, mask, cellsize=(32, 32)):
+        """
+        'mask' 2d numpy array (rows, columns) of collision bits.
+        'cellsize' pixel size of a single cell. using the maps tilesize.
+        'size' grid size in cells (width, height).
+        'listeners' list of functions that are called with the cell (x, y)
+            whenever a cell is changed by 'setCell()'. 'none' means the
+            whole grid changed, see 'setMask()'.
+        """
+        self.mask = np.asarray(mask, dtype=np.uint8)# numpy.ndarray
+        self.cellsize = tuple(cellsize)# tuple
+        self.size = (self.mask.shape[1], self.mask.shape[0])# tuple
+        self.listeners = []# list
+    def __getBits(self, categories):# int
+        """
+        return the bits of one or more categories. 'categories' can be a
+        name, a list of names or the bits themselves. 'none' means all.
+        """
+        if categories is None:
+            return 0xFF
+        if type(categories) is int:
+            return categories
+        if type(categories) is str:
+            categories = [categories]
+        bits = 0
+        for name in categories:
+            bits |= COLLISIONS[name]
+
+        return bits
+    def __clip(self, rect):# pygame.rect
+        """return the part of a rect in cells that lies inside the grid."""
+        return pg.Rect(rect).clip(pg.Rect((0, 0), self.size))
+    def __getCellRect(self, rect):# pygame.rect
+        """return the rect of cells a rect in pixels covers."""
+        w, h = self.cellsize
+        left = rect[0] // w
+        top = rect[1] // h
+        right = (rect[0] + rect[2] - 1) // w
+        bottom = (rect[1] + rect[3] - 1) // h
+
+        return pg.Rect(left, top, right - left + 1, bottom - top + 1)
+    def getCell(self, cell):# int
+        """return the collision bits of the cell (x, y)."""
+        x, y = cell
+        if 0 <= x < self.size[0] and 0 <= y < self.size[1]:
+            return int(self.mask[y, x])
+
+        return 0
+    def isBlocked(self, cell, categories=None):# bool
+        """
+        return 'true' if the cell (x, y) has any of the categories. all
+        categories are checked if none are given.
+        """
+        return bool(self.getCell(cell) & self.__getBits(categories))
+    def getRegion(self, rect, categories=None):# numpy.ndarray
+        """
+        return a 2d numpy array of bools for the cells inside of 'rect'. the
+        rect is given in cells. only the part inside of the grid is returned.
+        """
+        rect = self.__clip(rect)
+        area = self.mask[rect.top:rect.bottom, rect.left:rect.right]
+
+        return (area & self.__getBits(categories)) != 0
+    def getBlockedCells(self, rect, categories=None):# list
+        """
+        return a list of (x, y) cell positions inside of 'rect' that have
+        any of the categories. the rect is given in cells.
+        """
+        rect = self.__clip(rect)
+
+        return [
+            (x + rect.left, y + rect.top)
+            for y, x in np.argwhere(
+                self.getRegion(rect, categories)
+            ).tolist()
+        ]
+    def collides(self, rect, categories=None):# bool
+        """
+        return 'true' if a rect in pixels overlaps any cell that has one of
+        the categories.
+        """
+        return bool(self.getRegion(
+            self.__getCellRect(rect),
+            categories
+        ).any())
+    def getRects(self, rect, categories=None):# list
+        """
+        return a rect in pixels for every cell under a rect in pixels that
+        has one of the categories. hand them to the collision checks of
+        entities.
+        """
+        w, h = self.cellsize
+
+        return [
+            pg.Rect(x * w, y * h, w, h)
+            for x, y in self.getBlockedCells(
+                self.__getCellRect(rect),
+                categories
+            )
+        ]
+    def setCell(self, cell, categories):
+        """
+        set the collision bits of the cell (x, y) and tell the listeners.
+        'categories' names or bits. 0 clears the cell.
+        """
+        x, y = cell
+        if 0 <= x < self.size[0] and 0 <= y < self.size[1]:
+            self.mask[y, x] = self.__getBits(categories)
+            for listener in self.listeners:
+                listener(cell)
+    def setMask(self, mask):
+        """
+        replace the collision bits of every cell at once, like after a map
+        has been reloaded. the listeners are told about each changed cell.
+        if the grid changes size they are called with 'none' instead, as
+        every cell may have changed.
+        """
+        mask = np.asarray(mask, dtype=np.uint8)
+        if mask.shape != self.mask.shape:
+            self.mask = mask.copy()
+            self.size = (self.mask.shape[1], self.mask.shape[0])
+            for listener in self.listeners:
+                listener(None)
+            return
+        changed = np.argwhere(mask != self.mask).tolist()
+        self.mask[...] = mask
+
+        for y, x in changed:
+            for listener in self.listeners:
+                listener((x, y))
+    def raycast(self, start, end, categories="block"):# tuple / none
+        """
+        walk the cells a line from 'start' to 'end' passes, one border at a
+        time, and return ((x, y), distance) of the first cell that has one
+        of the categories. 'distance' is the length in pixels from 'start' to
+        the point the line enters that cell. both points are given in pixels.
+        lines through a corner cross it horizontally first. the cell the end
+        point lies in is the last one walked, even if it's only entered at
+        the very end. returns 'none' if nothing is in the way.
+        """
+        w, h = self.cellsize
+        bits = self.__getBits(categories)
+        x, y = int(start[0] // w), int(start[1] // h)
+        dx, dy = abs(end[0] - start[0]), abs(end[1] - start[1])
+        stepx = 1 if end[0] > start[0] else -1
+        stepy = 1 if end[1] > start[1] else -1
+        # pixels along each axis to the next vertical and horizontal border
+        ax = (x + 1) * w - start[0] if stepx > 0 else start[0] - x * w
+        ay = (y + 1) * h - start[1] if stepy > 0 else start[1] - y * h
+        # borders left to cross along each axis
+        nx = abs(int(end[0] // w) - x)
+        ny = abs(int(end[1] // h) - y)
+        length = math.hypot(end[0] - start[0], end[1] - start[1])
+        t = 0
+
+        while True:
+            if self.getCell((x, y)) & bits:
+                return (x, y), t * length
+            if not nx and not ny:
+                return None
+            # comparing cross products instead of line positions, so ties
+            # at corners don't depend on rounding. see 'raycastMany()'
+            if nx and (not ny or ax * dy <= ay * dx):
+                t, ax, x, nx = ax / dx, ax + w, x + stepx, nx - 1
+            else:
+                t, ay, y, ny = ay / dy, ay + h, y + stepy, ny - 1
+    def raycastMany(self, starts, ends, categories="block"):# tuple
+        """
+        cast many lines at once and return (hits, cells, distances) as numpy
+        arrays. the cells are the same ones 'raycast()' walks, with the same
+        rule for corners and end points, but they are worked out for all
+        lines in one go instead of one after another.
+        'starts' and 'ends' sequences of (x, y) points in pixels.
+        'hits' bools whether a line was blocked.
+        'cells' (x, y) of the first blocked cell of each line. lines that
+            aren't blocked get the cell their end point lies in.
+        'distances' pixels from the start to the blocked cell. lines that
+            aren't blocked get their full length.
+        """
+        cellsize = np.array(self.cellsize, dtype=float)
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        first = (starts // cellsize).astype(int)
+        counts = np.abs((ends // cellsize).astype(int) - first)
+        steps = np.where(ends > starts, 1, -1)
+        spans = np.abs(ends - starts)
+        lengths = np.hypot(*(ends - starts).T)
+        # pixels along each axis to the first vertical and horizontal border
+        offsets = np.where(
+            steps > 0,
+            (first + 1) * cellsize - starts,
+            starts - first * cellsize
+        )
+        # the start cell and the cell entered with each border crossing.
+        # the crossings along one axis tell how many have been made along
+        # the other one by then, so nothing has to be sorted. the cross
+        # products are the same 'raycast()' compares
+        order = [np.zeros((len(first), 1), dtype=int)]
+        times = [np.zeros((len(first), 1))]
+        xs = [first[:, 0, None]]
+        ys = [first[:, 1, None]]
+        for axis, other in ((0, 1), (1, 0)):
+            k = np.arange(counts[:, axis].max(initial=0))
+            along = offsets[:, axis, None] + k * cellsize[axis]
+            span = spans[:, axis, None]
+            moving = span > 0
+            span = np.where(moving, span, 1)
+            divisor = cellsize[other] * span
+            crossed = (
+                along * spans[:, other, None] -
+                offsets[:, other, None] * span
+            )
+            # crossing corners horizontally first, like 'raycast()'
+            if axis == 0:
+                before = -(-crossed // divisor)
+            else:
+                before = crossed // divisor + 1
+            before = np.clip(before, 0, counts[:, other, None]).astype(int)
+            cells = [None, None]
+            cells[axis] = (
+                first[:, axis, None] + steps[:, axis, None] * (k + 1)
+            )
+            cells[other] = (
+                first[:, other, None] + steps[:, other, None] * before
+            )
+            valid = moving & (k < counts[:, axis, None])
+            order.append(np.where(valid, k + 1 + before, -1))
+            times.append(along / span)
+            xs.append(cells[0])
+            ys.append(cells[1])
+        order = np.concatenate(order, axis=1)
+        times = np.concatenate(times, axis=1)
+        xs = np.concatenate(xs, axis=1)
+        ys = np.concatenate(ys, axis=1)
+        inside = (
+            (order >= 0) &
+            (xs >= 0) & (xs < self.size[0]) &
+            (ys >= 0) & (ys < self.size[1])
+        )
+        bits = np.take(self.mask, np.where(inside, ys * self.size[0] + xs, 0))
+        blocked = inside & ((bits & self.__getBits(categories)) != 0)
+        # the blocked cell that is entered first
+        index = np.where(blocked, order, order.shape[1]).argmin(axis=1)
+        rows = np.arange(len(order))
+        hits = blocked[rows, index]
+        cells = np.where(
+            hits[:, None],
+            np.stack((xs[rows, index], ys[rows, index]), axis=1),
+            first + steps * counts
+        )
+        distances = np.where(hits, times[rows, index] * lengths, lengths)
+
+        return hits, cells, distances
+    def isVisible(self, start, end, categories="block"):# bool
+        """
+        return 'true' if no cell with one of the categories lies on the line
+        from 'start' to 'end'. both points are given in pixels.
+        """
+        return self.raycast(start, end, categories) is None
@@ -2,11 +2,14 @@ from .utils import (
     PATH,
     validateDict,
     loadAssets,
+    loadImage,
+    holdImages,
     draw,
     getFrames,
     drawBorder,
     getAnchors
 )
+from .collision import BlockIndex, CollisionGrid
 import pygame as pg
 from .libs.zrect import ZRect
 
@@ -36,27 +39,57 @@ class Entity(pg.sprite.Sprite):
         'facing' is used for determining the right picture for entity to
             display.
         'moving' if key or controller sticks are used 'true' else 'false'.
-        'knownblocks' holds all block-tiles from the active map.
+        'knownblocks' holds all block-tiles from the active map. can also be
+            a 'BlockIndex' so only blocks near the entity are checked, or a
+            'CollisionGrid' so only the cells under it are checked.
         'dev_move' if 'true' this will render the entity bounding borders.
+        'zoomed' cache of scaled frames for the current zoom level.
+        'zoomlevel' the zoom level 'zoomed' holds frames for.
+        """
+        # initializing the sprite
+        pg.sprite.Sprite.__init__(self)
+        # config and everything built from it
+        self.__load(name)
+        # additional attributes
+        self.facing = "down"# str
+        self.moving = False# bool
+        self.knownblocks = ["knownblocks"]# list
+        self.zoomlevel = 1# int
+        # keeping __init__ organized
+        self.__build()
+    def __load(self, name, reload=False):
+        """
+        read the config of the entity by its asset name and build its frames,
+        animations and boxes from it. 'reload' reads the images from their
+        files again instead of taking them from 'IMAGES'.
         """
         # looking for a json-file to use as the config
         for each in loadAssets(PATH["entities"] + "\\" + name):# dict
             if each["type"] == "player":
                 self.config = each
-        # initializing the sprite
-        pg.sprite.Sprite.__init__(self)
-        # additional attributes
         self.name = self.config["name"]# str
-        self.rawimage = pg.image.load(# pygame.surface
-            self.config["filepath"] + "\\" + self.config["image"]
+        # a copy, since frames are drawn on and the loaded image is shared
+        self.rawimage = loadImage(# pygame.surface
+            self.config["filepath"] + "\\" + self.config["image"],
+            reload
+        ).copy()
+        self.avatar = loadImage(# pygame.surface
+            self.config["filepath"] + "\\" + self.config["avatar"],
+            reload
         )
+        self.animationspeed = self.config["animationspeed"]# int
+        self.__createFrames()
+        self.rect = ZRect(self.image.get_rect())# pgzero.zrect
+        self.anchors = getAnchors(self.rect.size)# dict
+        self.collisionbox = pg.Rect(self.config["collisionbox"])# pygame.rect
+        self.speed = self.config["speed"]# int
+        self.dev_mode = self.config["dev_mode"]# bool
+        # images loaded before the display are converted later
+        holdImages(self)
+    def __createFrames(self):
+        """cut the frames out of the raw image and animate them."""
         self.frames = getFrames(self.rawimage, self.config["framesize"])# list
         self.image = self.frames[0]# pygame.surface
-        self.rect = ZRect(self.image.get_rect())# pgzero.zrect
-        self.avatar = pg.image.load(# pygame.surface
-            self.config["filepath"] + "\\" + self.config["avatar"]
-        )
-        self.animationspeed = self.config["animationspeed"]# int
         self.animations = {# dict
             "walkdown": Animation({
                 "frames": self.frames,
@@ -79,15 +112,7 @@ class Entity(pg.sprite.Sprite):
                 "duration": self.animationspeed
                 })
             }
-        self.anchors = getAnchors(self.rect.size)# dict
-        self.collisionbox = pg.Rect(self.config["collisionbox"])# pygame.rect
-        self.speed = self.config["speed"]# int
-        self.facing = "down"# str
-        self.moving = False# bool
-        self.knownblocks = ["knownblocks"]# list
-        self.dev_mode = self.config["dev_mode"]# bool
-        # keeping __init__ organized
-        self.__build()
+        self.zoomed = {}# dict
     def __build(self):
         """drawing depending on dev_mode."""
         # redrawing player animation frame
@@ -110,8 +135,10 @@ class Entity(pg.sprite.Sprite):
     def __moveSingleAxis(self, pos, blocks):
         """
         if a list of blocks is given the move-method then checks for collision
-        first before actually moving the player.
+        first before actually moving the player. if 'blocks' is a block index
+        only the blocks under the swept collision box are checked.
         """
+        swept = pg.Rect(self.config["collisionbox"]).move(self.rect.topleft)
         self.rect.left = self.rect.left + pos[0]
         self.rect.top = self.rect.top + pos[1]
         # absolute position of collisionbox. necessary for computing collision
@@ -119,6 +146,15 @@ class Entity(pg.sprite.Sprite):
             self.rect.left + self.config["collisionbox"][0],
             self.rect.top + self.config["collisionbox"][1]
         )
+        # narrowing down the blocks to the ones near the entity
+        if type(blocks) is BlockIndex:
+            blocks = blocks.query(swept.union(self.collisionbox))
+        # blocked cells of a collision grid
+        elif type(blocks) is CollisionGrid:
+            blocks = blocks.getRects(
+                swept.union(self.collisionbox),
+                "block"
+            )
         # collision checking
         for block in blocks:
             if self.collisionbox.colliderect(block):
@@ -166,6 +202,26 @@ class Entity(pg.sprite.Sprite):
                 self.image = self.frames[3]
         # resetting this so the idle-image can jump in after releasing a key
         self.moving = False
+    def getZoomedImage(self, zoom=1):# pygame.surface
+        """
+        return the current image scaled by 'zoom'. each frame is only scaled
+        once per zoom level. frames of other levels are dropped as soon as
+        the zoom level changes.
+        """
+        if zoom == 1:
+            return self.image
+        if zoom != self.zoomlevel:
+            self.zoomed = {}
+            self.zoomlevel = zoom
+        # keeping the frame itself so its id can't be reused
+        if id(self.image) not in self.zoomed:
+            w, h = self.image.get_size()
+            self.zoomed[id(self.image)] = (
+                self.image,
+                pg.transform.scale(self.image, (w * zoom, h * zoom))
+            )
+
+        return self.zoomed[id(self.image)][1]
     def move(self, axis):
         """."""
         x, y = axis
@@ -197,6 +253,32 @@ class Entity(pg.sprite.Sprite):
             self.rect.topleft = pos.topleft
         elif type(pos) is tuple:
             self.rect.topleft = pos
+    def reload(self):
+        """
+        read the config and images again, like after they have been edited.
+        the entity keeps its position, facing and known blocks.
+        """
+        topleft = self.rect.topleft
+        self.__load(self.config["path"].split("\\")[-2], True)
+        self.rect.topleft = topleft
+        self.collisionbox.topleft = (
+            self.rect.left + self.config["collisionbox"][0],
+            self.rect.top + self.config["collisionbox"][1]
+        )
+        self.__build()
+    def prepareImages(self):
+        """
+        take the images in the display's format once a display exists and
+        cut the frames out of them again. see 'holdImages()'.
+        """
+        self.rawimage = loadImage(
+            self.config["filepath"] + "\\" + self.config["image"]
+        ).copy()
+        self.avatar = loadImage(
+            self.config["filepath"] + "\\" + self.config["avatar"]
+        )
+        self.__createFrames()
+        self.__build()
     def setAnimationSpeed(self, speed):
         """call animations to update their animation speed (duration)."""
         for anim in self.animations:
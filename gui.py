@@ -65,6 +65,9 @@ class App:
                             pygame-events by going through the
                             'events'-property over and over.
         'resized'           bool to check if the window has been resized.
+        'renderer'          optional 'WorldRenderer'. if given, only the
+                            screen areas it changed are pushed to the
+                            display instead of the whole screen.
         """
         self.style = Stylesheet(
             type = "app",
@@ -95,6 +98,7 @@ class App:
         self._events = []
         self.keys = []
         self.resized = False
+        self.renderer = None
         # adding this instance to 'globals'
         globals()["app"] = self
     # dynamic attributes
@@ -168,7 +172,9 @@ class App:
             # is the library's standard background-image.
             if bg == str(u.LIBPATH["windowbg"]):
                 self.style.background_repeat = "xy"
-            bg = pg.image.load(bg)
+            bg = u.loadImage(bg)
+            # images loaded before the display are converted later
+            u.holdImages(self)
         # filling a newly created surface
         elif type(bg) is tuple:
             color = bg
@@ -187,6 +193,12 @@ class App:
                 )
 
         return bg
+    def prepareImages(self):
+        """
+        build the background again from the images in the display's format
+        once a display exists. see 'u.holdImages()'.
+        """
+        self.background = self.createBackground()
     # basic methods
     def draw(self, object, rect=None, area=None):
         """
@@ -214,8 +226,15 @@ class App:
             else:
                 self.display.blit(object, rect, area)
     def redraw(self):
-        """redraws everything from 'draw_list'."""
-        self.draw_list.clear(self.display, self.background)
+        """
+        redraws everything from 'draw_list' and returns the changed rects.
+        """
+        # with a world renderer the world is restored instead of the
+        # background
+        if self.renderer:
+            self.draw_list.clear(self.display, self.renderer.restore)
+        else:
+            self.draw_list.clear(self.display, self.background)
         changes = self.draw_list.draw(self.display)
         # rendering another mouse-cursor depending on some specific element-
         # types
@@ -245,6 +264,8 @@ class App:
         # updating all drawn sprites
         for each in self.draw_list: each.update()
         pg.display.update(changes)
+
+        return changes
     def resize(self, size):# none / tuple
         """resizes the app's surface. 'size' needs to be a tuple."""
         # make new display surface
@@ -277,8 +298,14 @@ class App:
         self._events = self.events
         # overdrawing old moved sprite-trails on backgrounds
         self.redraw()
-        # refreshing display visuals
-        pg.display.update()
+        # refreshing display visuals. with a world renderer only the areas it
+        # changed
+        if self.renderer:
+            pg.display.update(self.renderer.dirty)
+            # frames without a new draw push nothing
+            self.renderer.dirty = []
+        else:
+            pg.display.update()
         # updating fps
         self.clock.tick(self.preffered_fps)
         self.fps = int(self.clock.get_fps())
@@ -289,6 +316,7 @@ class Cursor(pg.sprite.Sprite):
         renders the native cursor invisible, loads either an image from a
         given path or a library-default value.
 
+        'path'          path to the image file holding the cursors.
         'full_image'    the once loaed full-image as a pg.surface.
         'state'         the actual state of the mouse in a str. by changing
                         this, the app will draw another mouse-curor based on
@@ -298,9 +326,18 @@ class Cursor(pg.sprite.Sprite):
         """
         pg.sprite.Sprite.__init__(self)
         if not image_path: image_path = u.PATH["sysimg"] + "\\cursors.png"
-        self.full_image = pg.image.load(image_path)
+        self.path = image_path
+        self.full_image = u.loadImage(image_path)
+        # images loaded before the display are converted later
+        u.holdImages(self)
         self.state = "normal"
         pg.mouse.set_visible(False)
+    def prepareImages(self):
+        """
+        take the cursor image in the display's format once a display exists.
+        see 'u.holdImages()'.
+        """
+        self.full_image = u.loadImage(self.path)
     # dynamic properties
     @property
     def image(self):
@@ -804,6 +841,71 @@ class Graph(GuiMaster):
         self.image.blit(self.chart, (0, 0))
         # updating next position for line to start drawing from
         self.last_stat = self.inspect
+class MiniMap(GuiMaster):
+    """
+    miniature view of a map with a marker showing what the camera sees. it
+    draws one of the map's downscaled previews, so updating it costs a single
+    small blit instead of scaling the screen each frame.
+    """
+    def __init__(self, **kwargs):
+        """
+        uses 'GuiMaster' as its parent with additional methods and attributes.
+
+        'map'               the 'Map'-object to display.
+        'level'             'int' of the map's preview level that fits the
+                            element best. if even the smallest level is too
+                            big, the preview scrolls along with the camera.
+        'camera'            camera to follow. change this to track another
+                            one. example:
+                            minimap.camera = camera
+        """
+        GuiMaster.__init__(self, type="mini_map", **kwargs)
+        self.map = self.style.map
+        self.level = 0
+        if self.map:
+            self.level = self.map.getPreviewLevel(self.rect.size)
+        self.camera = None
+    # basic methods
+    def update(self):
+        """overwrites parent's 'update()'-method."""
+        if not self.map or not self.camera:
+            return
+        preview = self.map.getPreview(self.level)
+        if not preview:
+            return
+        # ratio between map and preview
+        scale = (
+            preview.get_width() / self.map.rect.width,
+            preview.get_height() / self.map.rect.height
+        )
+        view = self.camera.viewport
+        marker = pg.Rect(
+            int(view.left * scale[0]),
+            int(view.top * scale[1]),
+            max(int(view.width * scale[0]), 1),
+            max(int(view.height * scale[1]), 1)
+        )
+        # centering the preview or scrolling it along with the marker
+        offset = [0, 0]
+        for i in range(2):
+            if preview.get_size()[i] <= self.rect.size[i]:
+                offset[i] = int(
+                    (self.rect.size[i] - preview.get_size()[i]) / 2
+                )
+            else:
+                offset[i] = min(max(
+                    int(self.rect.size[i] / 2) - marker.center[i],
+                    self.rect.size[i] - preview.get_size()[i]
+                ), 0)
+        self.redraw_background()
+        self.image.blit(preview, offset)
+        pg.draw.rect(
+            self.image,
+            self.style.marker_color,
+            marker.move(offset),
+            1
+        )
+        self.redraw_border()
 class Grid(GuiMaster):
     """grid-surface that has a border-drawn grid on it. used for tables etc."""
     def __init__(self, **kwargs):
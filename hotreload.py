@@ -0,0 +1,174 @@
+from .utils import PATH, validateDict
+from .map import TILESETS
+import pygame as pg
+import os
+
+class HotReload:
+    """
+    keeps the modification time of every file in the assets tree and looks
+    for changed ones every few hundred milliseconds. a changed file only
+    rebuilds what was built from it: a changed map file bakes the layers
+    that changed in it again, a changed tileset is built again and swapped
+    into every watched map, where only the layers placing its tiles are
+    baked again. anything else, like xml interfaces, can be watched with a
+    function of its own. usage:
+    reloader = HotReload()
+    reloader.watchMap(map)
+    reloader.watchEntity(player)
+    reloader.watch(
+        [PATH["interface"] + "\\menu\\menu.xml"],
+        lambda paths: menu.build(loadXMLInterface("menu"))
+    )
+    # with each game loop
+    reloader.update()
+    """
+    default = {
+        "path": PATH["assets"],
+        "interval": 500,
+        "cache": True
+    }
+    def __init__(self, config={}):
+        """
+        'options' validated dict of properties.
+            'path' root folder of the tree that is indexed.
+            'interval' milliseconds between two looks at the tree.
+            'cache' if 'true' rebuilt tilesets write their compiled cache
+                again.
+        'index' dict of modification times by file path.
+        'watchers' list of [paths, function] pairs. each function is called
+            with the list of its changed paths, in the order they were
+            added.
+        'maps' list of watched maps. rebuilt tilesets are swapped into them.
+        'tilesets' dict of the watcher of each watched tileset by its name.
+        'next' ticks of the next look at the tree.
+        """
+        self.options = validateDict(config, self.default)# dict
+        self.index = self.scan()# dict
+        self.watchers = []# list
+        self.maps = []# list
+        self.tilesets = {}# dict
+        self.next = 0# int
+    def __normalize(self, path):# str
+        """return a path the way it's written in the index."""
+        return os.path.normcase(os.path.normpath(path))
+    def scan(self):# dict
+        """
+        return a dict of the modification times of every file in the tree.
+        compiled caches are left out, since rebuilding writes them.
+        """
+        index = {}
+        folders = [self.options["path"]]
+
+        while folders:
+            try:
+                entries = os.scandir(folders.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        folders.append(entry.path)
+                    elif not entry.name.endswith(".npz"):
+                        try:
+                            index[self.__normalize(entry.path)] = (
+                                entry.stat().st_mtime
+                            )
+                        except OSError:
+                            pass
+
+        return index
+    def watch(self, paths, function):# list
+        """
+        call 'function' with the list of changed paths whenever any of
+        'paths' changes. returns the watcher, so its paths can be changed.
+        """
+        watcher = [[self.__normalize(path) for path in paths], function]
+        self.watchers.append(watcher)
+
+        return watcher
+    def watchTileset(self, name):
+        """
+        build the tileset with that name again when one of its files changes
+        and swap it into every watched map.
+        """
+        if name in self.tilesets or name not in TILESETS:
+            return
+        self.tilesets[name] = self.watch(
+            TILESETS.tilesets[name].sources,
+            lambda paths: self.__reloadTileset(name)
+        )
+    def watchMap(self, map):
+        """
+        rebuild the changed layers of a map when its file changes. the
+        tilesets of the map are watched as well.
+        """
+        for name in map.tilesets:
+            self.watchTileset(name)
+        self.maps.append(map)
+        self.watch([map.config["path"]], lambda paths: self.__reloadMap(map))
+    def watchEntity(self, entity):
+        """read an entity again when its config or one of its images change."""
+        def reload(paths):
+            entity.reload()
+            watcher[0] = self.__getEntitySources(entity)
+
+        watcher = self.watch(self.__getEntitySources(entity), reload)
+    def __getEntitySources(self, entity):# list
+        """return a list of every file an entity is built from."""
+        return [
+            self.__normalize(path) for path in (
+                entity.config["path"],
+                entity.config["filepath"] + "\\" + entity.config["image"],
+                entity.config["filepath"] + "\\" + entity.config["avatar"]
+            )
+        ]
+    def __reloadTileset(self, name):
+        """swap a rebuilt tileset into every watched map using it."""
+        tileset = TILESETS.reload(name, self.options["cache"])
+        if tileset is None:
+            return
+        # the tileset may point to another image now
+        self.tilesets[name][0] = [
+            self.__normalize(path) for path in tileset.sources
+        ]
+        for map in self.maps:
+            map.setTileset(name, tileset)
+    def __reloadMap(self, map):
+        """rebuild the changed layers of a map and watch its new tilesets."""
+        map.reload()
+        for name in map.tilesets:
+            self.watchTileset(name)
+    def update(self, ticks=None):# list
+        """
+        look for changed files once the interval has passed and rebuild
+        whatever was built from them. call it with each game loop. files
+        that can't be read yet, like ones still being written, are tried
+        again next time. returns a list of the changed paths.
+        """
+        if ticks is None:
+            ticks = pg.time.get_ticks()
+        if ticks < self.next:
+            return []
+        self.next = ticks + self.options["interval"]
+        index = self.scan()
+        changed = [
+            path for path, mtime in index.items()
+            if self.index.get(path) != mtime
+        ]
+        self.index = index
+        lookup = set(changed)
+        failed = set()
+
+        for paths, function in list(self.watchers):
+            found = [path for path in paths if path in lookup]
+            if not found:
+                continue
+            try:
+                function(found)
+            except (OSError, ValueError, pg.error):
+                failed.update(found)
+        # watchers sharing a path may both fail on it
+        for path in failed:
+            self.index.pop(path, None)
+
+        return changed
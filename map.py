@@ -1,39 +1,123 @@
 from .utils import (
     PATH,
     loadAssets,
+    loadCache,
+    saveCache,
     draw,
+    validateDict,
     createTiledMap,
-    getFrames
+    getCells,
+    getChunks,
+    drawTiles,
+    mergeBlocks,
+    getFrames,
+    flipTile,
+    decodeTileData,
+    getGrid,
+    loadGrid,
+    prepareImage,
+    holdImages,
+    GIDMASK,
+    COLLISIONS
 )
+from .collision import BlockIndex, CollisionGrid
 import pygame as pg
+import numpy as np
+import json
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class Map(pg.Surface):
     """
     holds tilesets, tiles and layers. the map object itself can be drawn on a
     surface for preview purpose. for real map drawing us the layers of the map.
+    sparse and streamed layers aren't baked to a surface of their own, so
+    let the layers draw themselves.
     example:
-    for layer in self.layers:
-        draw(self.layers[layer], surface)
-    or:
-        draw(self.layers, surface)
+    for _, layer in self.layers.items():
+        if layer.type == "tilelayer":
+            layer.draw(surface)
+    or only the parts of the layers the camera is looking at:
+        self.drawVisible(surface, camera)
     """
-    def __init__(self, name):
+    default = {
+        "chunksize": None,
+        "mergeblocks": False,
+        "cache": True,
+        "lazypreviews": False,
+        "workers": 1,
+        "progress": None
+    }
+    def __init__(self, name, config={}):
         """
         load a dict from a json-file and make it config.
         'name' is gonna be adapted when the map is created with 'tiled'.
         'size' recalculated map size. consider using the rect anyways.
         'tilesize' most commonly its 16x16 or 32x32.
-        'tiles' is a list of all the tiles cut out from the image.
+        'tiles' flat table of every tile from all tilesets. see 'TileTable'.
         'layers' every tile is drawn to its layer. you can draw each layer
             sperately or use the entiry layers-dict to draw on a surface.
-        'blocks' is a list with all non-passable tiles.
+        'blocks' is a list with all non-passable tiles. blocks of streamed
+            chunks and those added with 'addBlock()' are kept in it as well.
+        'blockslots' dict of the position of each rect in 'blocks' by its
+            id, so single blocks are removed without searching the list.
+        'tileblocks' list of one rect per non-passable tile of the tile
+            layers that aren't streamed. same rects as 'blocks' unless
+            'mergeblocks' is used. handy for debugging.
+        'blockmask' 2d numpy array of bools. 'true' for every cell that is
+            blocked on any tile layer.
+        'blockindex' spatial hash of 'blocks'. hand this to entities as
+            'knownblocks' so they only check blocks near them.
+        'collision' collision grid of every tile layer with one bit per
+            collision category and cell. see 'CollisionGrid'. it can be
+            handed to entities as 'knownblocks' as well. streamed layers
+            aren't part of it.
+        'events' list of all event areas from the object layers.
+        'triggers' fires the event areas' functions. call
+            'self.triggers.update(entities)' with each game loop.
+        'infinite' 'true' for infinite 'tiled'-maps.
+        'streaming' 'true' if any layer is baked chunk by chunk around the
+            camera. this goes for infinite maps and layers with a grid file.
+            call 'stream()' with each game loop. these maps have no
+            'preview'.
+        'previews' pyramid of previews. level 0 is the full 'preview', each
+            further level is half the size of the one before. see
+            'getPreview()'.
+        'options' validated dict of loading options.
+            'chunksize' tuple of 2 in tiles. if given every tile layer is also
+                cut into chunks of that size so only visible chunks have to
+                be drawn.
+            'mergeblocks' if 'true' adjacent blocks are merged into bigger
+                rects on load. this means less rects to check collision with.
+            'lazypreviews' if 'true' the downscaled previews are only built
+                when they are asked for the first time.
+            'cache' if 'true' the map is loaded from a compiled cache file
+                next to its source. the cache gets rebuilt as soon as the map
+                or one of its tilesets changes.
+            'workers' number of threads the tilesets are loaded with. 1 loads
+                them one after another.
+            'progress' function that's called with (stage, done, total)
+                while the map is loading. stages are 'tilesets', 'layers',
+                'blocks' and 'preview'. see 'MapLoader'.
+        'cachepath' path to the compiled cache file of this map.
         """
-        # combine path + name to get the asset by its tail
-        for each in loadAssets(PATH["maps"] + "\\" + name):
-            if each["type"] == "map":
-                self.config = each# dict
+        self.options = validateDict(config, self.default)# dict
+        self.cachepath = PATH["maps"] + "\\" + name + "\\" + name + ".npz"# str
+        cache = None
+        if self.options["cache"]:
+            cache = loadCache(self.cachepath)# dict / none
+        if cache:
+            self.config = self.__readCache(cache)# dict
+        else:
+            # combine path + name to get the asset by its tail
+            for each in loadAssets(PATH["maps"] + "\\" + name):
+                if each["type"] == "map":
+                    self.config = each# dict
         # additional attributes
         self.name = self.config["name"]# str
+        self.infinite = bool(self.config.get("infinite"))# bool
         self.size = (# tuple
             self.config["width"] * self.config["tilewidth"],
             self.config["height"] * self.config["tileheight"]
@@ -43,11 +127,19 @@ class Map(pg.Surface):
             self.config["tileheight"]
         )
         self.tilesets = self.__createTilesets()# dict
-        self.tiles = self.__getTiles()# list
+        self.tiles = self.__getTiles()# tiletable
         self.layers = self.__createLayers()# dict
         self.blocks = []# list
+        self.blockmask = np.zeros(# numpy.ndarray
+            (self.config["height"], self.config["width"]),
+            dtype=bool
+        )
+        collision = np.zeros(self.blockmask.shape, dtype=np.uint8)
         for _, layer in self.layers.items():
-            if layer.type == "tilelayer":
+            # streamed layers add their blocks chunk by chunk
+            if layer.type == "tilelayer" and not layer.streaming:
+                self.blockmask |= layer.blockmask
+                collision |= self.tiles.collision[layer.grid]
                 # getting playerstart from a layer. may only be placed once per
                 # map
                 if layer.player_start:
@@ -55,11 +147,52 @@ class Map(pg.Surface):
                 # filling self.blocks with all layers blocks
                 for each in layer.blocks:
                     self.blocks.append(each)
-        # initiating surface
-        pg.Surface.__init__(self, self.size, pg.SRCALPHA)
-        self.rect = self.get_rect()# pygame.rect
-        # drawing the preview map
-        self.preview = self.__mix()# pygame.surface
+        if not cache and self.options["cache"]:
+            self.__writeCache()
+        self.tileblocks = self.blocks# list
+        if self.options["mergeblocks"]:
+            self.blocks = mergeBlocks(self.tileblocks, self.tilesize)
+        else:
+            # streamed and added blocks only go to 'blocks'
+            self.blocks = list(self.tileblocks)
+        self.blockslots = {# dict
+            id(rect): i for i, rect in enumerate(self.blocks)
+        }
+        self.blockindex = BlockIndex(self.blocks, self.tilesize)# blockindex
+        self.collision = CollisionGrid(# collisiongrid
+            collision,
+            self.tilesize
+        )
+        self.__report("blocks", 1, 1)
+        # event areas of every object layer
+        self.events = []# list
+        for _, layer in self.layers.items():
+            if layer.type == "objectgroup":
+                self.events += layer.objects
+        self.triggers = Triggers(self.events, self.tilesize)# triggers
+        # initiating surface. streamed maps are never drawn as a whole
+        self.streaming = any(# bool
+            layer.type == "tilelayer" and layer.streaming
+            for _, layer in self.layers.items()
+        )
+        if self.streaming:
+            pg.Surface.__init__(self, (0, 0), pg.SRCALPHA)
+            self.rect = pg.Rect((0, 0), self.size)# pygame.rect
+            self.preview = None# none
+            self.previews = []# list
+        else:
+            pg.Surface.__init__(self, self.size, pg.SRCALPHA)
+            self.rect = self.get_rect()# pygame.rect
+            # drawing the preview map
+            self.preview = self.__mix()# pygame.surface
+            self.previews = [self.preview]# list
+            if not self.options["lazypreviews"]:
+                self.getPreviewLevel((64, 64))
+        self.__report("preview", 1, 1)
+    def __report(self, stage, done, total):
+        """hand the loading progress to the 'progress' function if given."""
+        if self.options["progress"]:
+            self.options["progress"](stage, done, total)
     def __createLayers(self):# dict
         """
         return a dict of layers. each is an own dict with several attributes.
@@ -67,50 +200,130 @@ class Map(pg.Surface):
         tile-sizes.
         """
         layers = {}
+        total = len(self.config["layers"])
 
-        for each in self.config["layers"]:
-            # tiled layer (proof that this dict comes from a 'tiled'-file.)
-            if each["type"] == "tilelayer":
-                # updating layers
-                each.update({
-                    "tiles": self.tiles,
-                    "tilesize": self.tilesize
-                })
-                layer = Layer(each)
-                layers.update({each["name"]: layer})
-            # layer group
-            elif each["type"] == "group":
-                pass
-            # object layer
-            elif each["type"] == "objectgroup":
-                # updating layers
-                layer = Layer(each)
+        for i, each in enumerate(self.config["layers"]):
+            layer = self.__createLayer(each)
+            if layer is not None:
                 layers.update({each["name"]: layer})
+            self.__report("layers", i + 1, total)
 
         return layers
+    def __createLayer(self, each):# layer / none
+        """
+        return a layer built from its config in the map file. layer groups
+        return 'none'.
+        """
+        # tiled layer (proof that this dict comes from a 'tiled'-file.)
+        if each["type"] == "tilelayer":
+            # updating a copy so the config stays clean for caching
+            each = dict(each)
+            each.update({
+                "tiles": self.tiles,
+                "tilesize": self.tilesize,
+                "chunksize": self.options["chunksize"]
+            })
+            # huge layers can be read from a grid file next to the map
+            for prop in each.get("properties", []):
+                if prop["name"] == "file":
+                    each["file"] = (
+                        self.config["filepath"] + "\\" + prop["value"]
+                    )
+            return Layer(each)
+        # object layer
+        elif each["type"] == "objectgroup":
+            return Layer(each)
+        # layer group
+        return None
+    def __readCache(self, cache):# dict
+        """
+        return the map config from a compiled cache. the tile ids of every
+        tile layer are put back in as numpy arrays.
+        """
+        config = json.loads(str(cache["config"]))
+
+        for i, each in enumerate(config["layers"]):
+            if "layer_" + str(i) in cache:
+                each["data"] = cache["layer_" + str(i)]
+
+        return config
+    def __writeCache(self):
+        """
+        write the map config and the tile ids of each tile layer to a
+        compiled cache file. blocks and masks are cheap to get from the tile
+        ids again, so they aren't cached. the map's and its tilesets' source
+        files are used to check whether the cache is outdated.
+        """
+        config = dict(self.config)
+        config["layers"] = []
+        arrays = {}
+
+        for i, each in enumerate(self.config["layers"]):
+            each = dict(each)
+            if each["type"] == "tilelayer" and "data" in each:
+                arrays["layer_" + str(i)] = np.asarray(
+                    decodeTileData(
+                        each.pop("data"),
+                        each.pop("encoding", None),
+                        each.pop("compression", None)
+                    ),
+                    dtype=np.uint32
+                )
+            config["layers"].append(each)
+        # collecting every file the map depends on
+        sources = [self.config["path"]]
+        for _, tileset in self.tilesets.items():
+            sources += tileset.sources
+
+        saveCache(
+            self.cachepath,
+            sources,
+            config=np.array(json.dumps(config)),
+            **arrays
+        )
     def __createTilesets(self):# dict
-        """create a dict of tilesets and return it."""
+        """
+        create a dict of tilesets and return it. with more than one 'worker'
+        independent tilesets are loaded in parallel.
+        """
         tilesets = {}
-        # for each tileset-config
-        for cfg in self.config["tilesets"]:
-            split = cfg["source"].split("/")
-            name = split[-2]
-            file = split[-1]
-            # updating the list
-            tilesets.update({name: Tileset(name)})
-        return tilesets
-    def __getTiles(self):# list
+        # every tileset once, in the order the map declares them
+        names = list(dict.fromkeys(
+            cfg["source"].split("/")[-2]
+            for cfg in self.config["tilesets"]
+        ))
+        cache = self.options["cache"]
+        workers = min(self.options["workers"], len(names))
+
+        # tilesets shared with other maps are reused
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as pool:
+                jobs = {
+                    pool.submit(TILESETS.acquire, name, cache): name
+                    for name in names
+                }
+                for job in as_completed(jobs):
+                    tilesets[jobs[job]] = job.result()
+                    self.__report("tilesets", len(tilesets), len(names))
+        else:
+            for name in names:
+                tilesets[name] = TILESETS.acquire(name, cache)
+                self.__report("tilesets", len(tilesets), len(names))
+
+        return {name: tilesets[name] for name in names}
+    def __getTiles(self):# tiletable
         """
-        get tile objects from every appended tileset and return them in one
-        single list. means: multiple tilesets = more tiles
+        get the tiles from every appended tileset and return them in one
+        single flat table. each tileset starts at the 'firstgid' the map
+        declares for it, so tile ids can be used as indices right away.
         """
-        tiles = []
+        tilesets = []
 
-        for k, v in self.tilesets.items():
-            for tile in v.tiles:
-                tiles.append(tile)
+        for cfg in self.config["tilesets"]:
+            name = cfg["source"].split("/")[-2]
+            tilesets.append((cfg["firstgid"], self.tilesets[name]))
 
-        return tiles
+        return TileTable(tilesets)
     # experimental
     def __mix(self):# pygame.surface
         """
@@ -121,15 +334,409 @@ class Map(pg.Surface):
 
         for layer in self.layers:
             if self.layers[layer].type == "tilelayer":
-                draw(self.layers[layer], surface)
+                self.layers[layer].draw(surface)
 
         return surface
+    def getBlockedCells(self, rect):# list
+        """
+        return a list of (x, y) cell positions that are blocked inside of
+        'rect'. the rect is given in cells, not in pixels.
+        """
+        return getCells(self.blockmask, rect)
+    def getUsedTiles(self):# numpy.ndarray
+        """
+        return an array of bools telling which tile ids are placed on any
+        tile layer, including every frame of used animated tiles. streamed
+        layers aren't read as a whole, so they count as using every tile.
+        """
+        used = np.zeros(len(self.tiles), dtype=bool)
+
+        for _, layer in self.layers.items():
+            if layer.type == "tilelayer":
+                if layer.streaming:
+                    used[:] = True
+                else:
+                    used[np.unique(layer.grid)] = True
+        for gid, frames in self.tiles.animations.items():
+            if used[gid]:
+                for frame, _ in frames:
+                    used[frame] = True
+        used[0] = False
+
+        return used
+    def addBlock(self, rect):
+        """add a non-passable rect to the map and its block index."""
+        self.blockslots[id(rect)] = len(self.blocks)
+        self.blocks.append(rect)
+        self.blockindex.add(rect)
+    def removeBlock(self, rect):
+        """
+        remove a non-passable rect equal to 'rect' from the map and its block
+        index. the last block takes its place in 'blocks', so nothing has to
+        be moved or searched.
+        """
+        rect = self.blockindex.remove(rect)
+        if rect is None:
+            return
+        i = self.blockslots.pop(id(rect))
+        last = self.blocks.pop()
+        if last is not rect:
+            self.blocks[i] = last
+            self.blockslots[id(last)] = i
+    def __fillBlocks(self, blocks):
+        """
+        put 'blocks' into the block list and index in place of the ones they
+        hold, as entities may keep both as 'knownblocks'.
+        """
+        self.blocks[:] = blocks
+        self.blockslots = {id(rect): i for i, rect in enumerate(self.blocks)}
+        self.blockindex.clear()
+        for rect in self.blocks:
+            self.blockindex.add(rect)
+    def stream(self, camera, margin=1):
+        """
+        bake the chunks of infinite maps around the camera and drop those far
+        away. blocks of loaded and dropped chunks are added to or removed
+        from the map. call it with each game loop.
+        """
+        for _, layer in self.layers.items():
+            if layer.type == "tilelayer" and layer.streaming:
+                added, removed = layer.stream(camera, margin)
+                for rect in removed:
+                    self.removeBlock(rect)
+                for rect in added:
+                    self.addBlock(rect)
+    def animate(self, ticks=None):# list
+        """
+        update animated tiles on every tile layer. call it with each game
+        loop. 'ticks' time in milliseconds. returns a list of every redrawn
+        tile rect in map coordinates.
+        """
+        rects = []
+
+        for _, layer in self.layers.items():
+            if layer.type == "tilelayer":
+                rects += layer.animate(ticks)
+
+        return rects
+    def release(self):
+        """
+        hand the map's tilesets back to the registry. call this when the map
+        is not needed anymore, so unused tilesets can be evicted.
+        """
+        for name in self.tilesets:
+            TILESETS.release(name)
+    def __isChanged(self, old, new):# bool
+        """
+        return 'true' if two configs of the same layer differ. the tile ids
+        are compared decoded, as cached configs hold them as arrays.
+        """
+        if old is None:
+            return True
+        data = ("data", "encoding", "compression")
+        keys = (set(old) | set(new)) - set(data)
+        if any(old.get(key) != new.get(key) for key in keys):
+            return True
+        if "data" not in old or "data" not in new:
+            return "data" in old or "data" in new
+
+        return not np.array_equal(
+            np.asarray(decodeTileData(*[old.get(key) for key in data])),
+            np.asarray(decodeTileData(*[new.get(key) for key in data]))
+        )
+    def __refresh(self):
+        """
+        gather blocks, collision bits and the player start from the layers
+        again and redraw the preview. the block index and the collision grid
+        are updated in place, so whoever holds them keeps working with them.
+        """
+        self.blockmask = np.zeros(self.blockmask.shape, dtype=bool)
+        collision = np.zeros(self.blockmask.shape, dtype=np.uint8)
+        tileblocks = []
+        streamed = []
+
+        for _, layer in self.layers.items():
+            if layer.type != "tilelayer":
+                continue
+            # streamed layers keep the blocks of their loaded chunks
+            if layer.streaming:
+                for _, blocks in layer.loaded.items():
+                    streamed += blocks
+                continue
+            self.blockmask |= layer.blockmask
+            collision |= self.tiles.collision[layer.grid]
+            if layer.player_start:
+                self.playerstart = layer.player_start
+            tileblocks += layer.blocks
+        # refilling the lists, as entities may hold them as 'knownblocks'
+        self.tileblocks[:] = tileblocks
+        if self.options["mergeblocks"]:
+            tileblocks = mergeBlocks(tileblocks, self.tilesize)
+        self.__fillBlocks(tileblocks + streamed)
+        self.collision.setMask(collision)
+        if not self.streaming:
+            self.preview = self.__mix()
+            self.previews = [self.preview]
+            if not self.options["lazypreviews"]:
+                self.getPreviewLevel((64, 64))
+    def reload(self):# list
+        """
+        read the map file again and rebuild only the layers that changed in
+        it. tilesets are acquired and released if the map uses others now,
+        which rebuilds every tile layer. returns the names of the rebuilt
+        layers. maps whose size changed are loaded again as a whole, but
+        keep their block lists, block index and collision grid. raises
+        'FileNotFoundError' if there's no map file (anymore).
+        """
+        name = self.config["path"].split("\\")[-2]
+        config = None
+        for each in loadAssets(PATH["maps"] + "\\" + name):
+            if each["type"] == "map":
+                config = each
+        if config is None:
+            raise FileNotFoundError("no map file found for: " + name)
+        if any(
+            config.get(key) != self.config.get(key)
+            for key in ("width", "height", "tilewidth", "tileheight")
+        ):
+            tileblocks, blocks = self.tileblocks, self.blocks
+            blockindex, collision = self.blockindex, self.collision
+            self.release()
+            Map.__init__(self, name, self.options)
+            # whoever holds the old objects keeps working with them
+            tileblocks[:] = self.tileblocks
+            self.tileblocks = tileblocks
+            new = self.blocks
+            self.blocks = blocks
+            blockindex.cellsize = self.blockindex.cellsize
+            self.blockindex = blockindex
+            self.__fillBlocks(new)
+            collision.cellsize = self.collision.cellsize
+            collision.setMask(self.collision.mask)
+            self.collision = collision
+            return list(self.layers)
+        old = self.config
+        self.config = config
+        retile = [
+            (cfg["firstgid"], cfg["source"]) for cfg in config["tilesets"]
+        ] != [(cfg["firstgid"], cfg["source"]) for cfg in old["tilesets"]]
+        if retile:
+            tilesets = self.tilesets
+            self.tilesets = self.__createTilesets()
+            for each in tilesets:
+                TILESETS.release(each)
+            self.tiles = self.__getTiles()
+        # unchanged layers are kept as they are
+        configs = {each["name"]: each for each in old["layers"]}
+        layers = {}
+        rebuilt = []
+        for each in config["layers"]:
+            name = each["name"]
+            # a new tile table means new tile ids for every tile layer
+            if (
+                (not retile or each["type"] != "tilelayer") and
+                name in self.layers and
+                not self.__isChanged(configs.get(name), each)
+            ):
+                layers[name] = self.layers[name]
+                continue
+            layer = self.__createLayer(each)
+            if layer is not None:
+                layers[name] = layer
+                rebuilt.append(name)
+        objects = [
+            id(layer) for _, layer in self.layers.items()
+            if layer.type == "objectgroup"
+        ]
+        self.layers = layers
+        # event areas only change with the object layers
+        if objects != [
+            id(layer) for _, layer in self.layers.items()
+            if layer.type == "objectgroup"
+        ]:
+            self.events = []
+            for _, layer in self.layers.items():
+                if layer.type == "objectgroup":
+                    self.events += layer.objects
+            self.triggers = Triggers(self.events, self.tilesize)
+        self.__refresh()
+
+        return rebuilt
+    def setTileset(self, name, tileset):# list
+        """
+        swap in a rebuilt tileset, for example one from 'TILESETS.reload()'.
+        only the layers placing any of its tiles are baked again. returns the
+        names of the rebuilt layers.
+        """
+        if name not in self.tilesets:
+            return []
+        self.tilesets[name] = tileset
+        self.tiles = self.__getTiles()
+        # the tileset's ids reach up to the next tileset's first id
+        ranges = [
+            (first, last)
+            for first, last, each in zip(
+                self.tiles.firstgids,
+                self.tiles.firstgids[1:] + [GIDMASK + 1],
+                self.tiles.tilesets
+            )
+            if each is tileset
+        ]
+        configs = {each["name"]: each for each in self.config["layers"]}
+        rebuilt = []
+        for key, layer in self.layers.items():
+            if layer.type != "tilelayer":
+                continue
+            if layer.streaming or any(
+                ((layer.grid >= first) & (layer.grid < last)).any()
+                for first, last in ranges
+            ):
+                self.layers[key] = self.__createLayer(configs[key])
+                rebuilt.append(key)
+            else:
+                layer.tiles = self.tiles
+        self.__refresh()
+
+        return rebuilt
+    def getPreview(self, level=0):# pygame.surface / none
+        """
+        return the preview of that level. missing levels are built once by
+        halving the level before. the smallest level is 1 pixel wide or high.
+        """
+        if not self.previews:
+            return None
+        while len(self.previews) <= level:
+            w, h = self.previews[-1].get_size()
+            if w == 1 or h == 1:
+                break
+            self.previews.append(pg.transform.smoothscale(
+                self.previews[-1],
+                (w // 2, h // 2)
+            ))
+
+        return self.previews[min(level, len(self.previews) - 1)]
+    def getPreviewLevel(self, size):# int
+        """
+        return the first preview level that fits into 'size'. if none does,
+        the smallest level is returned.
+        """
+        level = 0
+        preview = self.getPreview(level)
+
+        while preview and (
+            preview.get_width() > size[0] or
+            preview.get_height() > size[1]
+        ):
+            if self.getPreview(level + 1) is preview:
+                break
+            level += 1
+            preview = self.getPreview(level)
+
+        return level
+    def drawVisible(self, surface, camera, overlap=None):
+        """
+        draw only the visible part of every tile layer to the surface.
+        'overlap' if 'true' or 'false' only layers with that overlap-state are
+            drawn. this way entities can be drawn in between.
+        """
+        for _, layer in self.layers.items():
+            if layer.type == "tilelayer":
+                if overlap is None or layer.overlap == overlap:
+                    layer.drawChunks(surface, camera)
+class MapLoader:
+    """
+    builds a map on a background thread, so the game loop keeps running
+    while files are read, images are decoded and layers are baked. the
+    tilesets are loaded in parallel. progress and the finished map are only
+    handed out by 'update()', which is meant to be called from the main
+    thread with each game loop. usage:
+    loader = MapLoader("Field", callback=showProgress)
+    # with each game loop
+    map = loader.update()
+    if map:
+        self.map = map
+    """
+    default = {
+        "workers": 4
+    }
+    def __init__(self, name, config={}, callback=None):
+        """
+        'name' name of the map to load.
+        'config' options the map is created with. see 'Map'. 'workers'
+            defaults to 4 here.
+        'callback' function that's called with (stage, done, total) on the
+            main thread whenever the loader made progress.
+        'stage', 'done', 'total' the latest progress.
+        'map' the finished map. 'none' while loading.
+        'error' exception raised while loading, if any. it is raised again by
+            'update()'.
+        """
+        self.name = name# str
+        self.config = dict(config)# dict
+        self.config.update({
+            "workers": validateDict(config, self.default)["workers"],
+            "progress": self.__report
+        })
+        self.callback = callback# function / none
+        self.stage = None# str / none
+        self.done = 0# int
+        self.total = 0# int
+        self.map = None# map / none
+        self.error = None# exception / none
+        self.finished = False# bool
+        self.queue = queue.Queue()# queue
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+    def __run(self):
+        """create the map. runs on the loader thread."""
+        try:
+            map = Map(self.name, self.config)
+            self.queue.put(("map", map))
+        except Exception as error:
+            self.queue.put(("error", error))
+    def __report(self, stage, done, total):
+        """queue the progress for the main thread. runs on the loader thread."""
+        self.queue.put(("progress", (stage, done, total)))
+    @property# bool
+    def loading(self):
+        """return 'true' while the map isn't ready yet."""
+        return not self.finished
+    def update(self):# map / none
+        """
+        hand queued progress to the callback and return the map once it's
+        ready. the map is only returned by the call that finishes it, so it
+        can be swapped in right there. call it with each game loop.
+        """
+        map = None
+
+        while True:
+            try:
+                kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.stage, self.done, self.total = value
+                if self.callback:
+                    self.callback(self.stage, self.done, self.total)
+            elif kind == "map":
+                self.map = map = value
+                self.finished = True
+            elif kind == "error":
+                self.error = value
+                self.finished = True
+        if self.error:
+            raise self.error
+
+        return map
 class Layer(pg.Surface):
     """
     representation of a 'tiled'-layer. each layer can be drawn seperately. it
     holds information about all its used tiles, its names, blocks, invisibles
     etc. can also be a 'object' layer for placing events and so on.
     """
+    zoomchunksize = (512, 512)
+    zoomlifetime = 60
+    sparsedensity = 0.05
     def __init__(self, config):
         """
         'type' declares the layer type for comparison.
@@ -141,6 +748,28 @@ class Layer(pg.Surface):
             'blocks' all non-passable tiles on this layer.
             'player_start' this is where the player starts when placed in
             'tiled'.
+            'grid' 2d numpy array (rows, columns) of this layer's tile ids.
+            'flags' 2d numpy array of each tile's flip flags.
+            'blockmask' 2d numpy array of bools. 'true' where a tile blocks.
+            'chunksize' pixel size of a single chunk or 'none'.
+            'chunks' dict of chunk surfaces with their chunk position (x, y)
+                as key. chunks without any visible pixels are left out.
+            'animated' dict of the cells each animated tile is placed on,
+                grouped by chunk position ('none' for the whole layer). for
+                each tile id it holds the cells' rows, columns and flip flags
+                as numpy arrays.
+            'animationframes' dict of the frame each animated tile shows
+                right now.
+            'streaming' 'true' for layers of infinite maps or layers with a
+                grid 'file'. their chunks are baked on demand by 'stream()'.
+                'flags' and 'blockmask' are 'none'. 'grid' is 'none' for
+                infinite maps and a read-only memory map for grid files.
+            'sparse' 'true' if at most 'sparsedensity' of the layer's cells
+                hold a visible tile. these layers are not baked to a surface
+                but drawn tile by tile from 'cells' where the camera looks.
+            'cells' tuple of numpy arrays (rows, columns, tile ids, flip
+                flags) of every visible tile of sparse layers. 'none' for
+                every other layer.
         'objectgroup':
             'config' now becomes a config dict of an object layer from a tiled
                 file.
@@ -150,17 +779,22 @@ class Layer(pg.Surface):
         self.name = config["name"]# str
         # tile layer
         if self.type == "tilelayer":
-            self.config = createTiledMap(config, config["tiles"])# dict
-            self.size = (# tuple
-                config["width"] * config["tilesize"][0],
-                config["height"] * config["tilesize"][1]
-            )
-            self.image = self.config["image"]# pygame.surface
-            self.blocks = self.config["blocks"]# list
-            self.player_start = self.config["player_start"]# pygame rect / none
-            # drawing to surface
-            pg.Surface.__init__(self, self.size, pg.SRCALPHA)
-            draw(self.image, self)
+            self.tiles = config["tiles"]# tiletable
+            self.tilesize = config["tilesize"]# tuple
+            self.chunksize = None# none / tuple
+            self.chunks = {}# dict
+            self.animationframes = {}# dict
+            self.zoomchunks = {}# dict
+            self.zoomed = {}# dict
+            self.zoomused = {}# dict
+            self.drawcount = 0# int
+            self.sparse = False# bool
+            self.cells = None# none / tuple
+            self.streaming = "chunks" in config or "file" in config# bool
+            if self.streaming:
+                self.__createStreamed(config)
+            else:
+                self.__createBaked(config)
         # object layer
         elif self.type == "objectgroup":
             self.config = config# dict
@@ -171,6 +805,252 @@ class Layer(pg.Surface):
             for prop in config["properties"]:
                 if prop["name"] == "overlap":
                     self.overlap = prop["value"]# bool
+    def __createBaked(self, config):
+        """
+        bake the whole tile layer to this surface at once. sparse layers only
+        keep their visible cells.
+        """
+        # the tiles are drawn right to this surface, not to a copy first
+        self.config = createTiledMap(config, self.tiles, False)# dict
+        self.size = (# tuple
+            config["width"] * self.tilesize[0],
+            config["height"] * self.tilesize[1]
+        )
+        self.blocks = self.config["blocks"]# list
+        self.player_start = self.config["player_start"]# pygame rect / none
+        self.grid = self.config["grid"]# numpy.ndarray
+        self.flags = self.config["flags"]# numpy.ndarray
+        self.blockmask = self.config["blockmask"]# numpy.ndarray
+        self.animated = {# dict
+            None: self.__findAnimated(self.grid, self.flags)
+        }
+        cells = self.config.pop("cells")
+        self.sparse = len(cells[0]) <= self.grid.size * self.sparsedensity
+        if self.sparse:
+            self.cells = cells
+            self.image = None# none
+            pg.Surface.__init__(self, (0, 0), pg.SRCALPHA)
+            return
+        # drawing to surface
+        pg.Surface.__init__(self, self.size, pg.SRCALPHA)
+        drawTiles(self, self.tiles, cells, self.tilesize)
+        self.image = self# pygame.surface
+        # cutting the layer into chunks
+        if "chunksize" in config and config["chunksize"]:
+            self.chunksize = (
+                config["chunksize"][0] * self.tilesize[0],
+                config["chunksize"][1] * self.tilesize[1]
+            )
+            self.chunks = getChunks(self, self.chunksize)
+    def __createStreamed(self, config):
+        """
+        prepare a layer that is baked chunk by chunk when its chunks come near
+        the camera. see 'stream()'. the tile ids come either from the chunks
+        of an infinite 'tiled'-map or from a memory-mapped grid file, which
+        is only paged in where it's read.
+        """
+        self.config = config# dict
+        self.sources = {}# dict
+        self.grid = None# none / numpy.memmap
+        if "file" in config:
+            self.grid = loadGrid(config["file"])
+            if "chunksize" in config and config["chunksize"]:
+                self.chunktiles = tuple(config["chunksize"])# tuple
+            else:
+                self.chunktiles = (32, 32)
+        else:
+            first = config["chunks"][0]
+            self.chunktiles = (first["width"], first["height"])
+            self.sources = {
+                (
+                    each["x"] // self.chunktiles[0],
+                    each["y"] // self.chunktiles[1]
+                ): each
+                for each in config["chunks"]
+            }
+        self.chunksize = (# tuple
+            self.chunktiles[0] * self.tilesize[0],
+            self.chunktiles[1] * self.tilesize[1]
+        )
+        self.loaded = {}# dict
+        self.chunkgrids = {}# dict
+        self.size = (0, 0)# tuple
+        self.image = None# none
+        self.blocks = []# list
+        self.player_start = None# none
+        self.flags = None# none
+        self.blockmask = None# none
+        self.animated = {}# dict
+        pg.Surface.__init__(self, self.size, pg.SRCALPHA)
+    def __getChunkData(self, pos):# numpy.ndarray / none
+        """
+        return the raw tile ids of a chunk as a 2d array or 'none' if there is
+        none. chunks at the edge of a grid file may be smaller.
+        """
+        w, h = self.chunktiles
+        if self.grid is not None:
+            area = self.grid[
+                max(pos[1] * h, 0):max((pos[1] + 1) * h, 0),
+                max(pos[0] * w, 0):max((pos[0] + 1) * w, 0)
+            ]
+            if area.size == 0:
+                return None
+            return np.array(area)
+        if pos not in self.sources:
+            return None
+        data = decodeTileData(
+            self.sources[pos]["data"],
+            self.config.get("encoding"),
+            self.config.get("compression")
+        )
+
+        return getGrid(data, (w, h))
+    def __loadChunk(self, pos):# list
+        """
+        decode and bake a single chunk. returns the chunk's block rects in
+        map coordinates.
+        """
+        data = self.__getChunkData(pos)
+        if data is None:
+            self.loaded[pos] = []
+            return []
+        chunk = createTiledMap(
+            {
+                "width": data.shape[1],
+                "height": data.shape[0],
+                "data": data,
+                "tilesize": self.tilesize
+            },
+            self.tiles
+        )
+        self.chunkgrids[pos] = chunk["grid"]
+        offset = (pos[0] * self.chunksize[0], pos[1] * self.chunksize[1])
+        blocks = [rect.move(offset) for rect in chunk["blocks"]]
+        # empty chunks are only remembered as loaded
+        if chunk["image"].get_bounding_rect().size != (0, 0):
+            self.chunks[pos] = chunk["image"]
+        animated = self.__findAnimated(chunk["grid"], chunk["flags"])
+        if animated:
+            self.animated[pos] = animated
+        self.loaded[pos] = blocks
+
+        return blocks
+    def __unloadChunk(self, pos):# list
+        """drop a baked chunk and return its block rects."""
+        blocks = self.loaded.pop(pos)
+        self.chunks.pop(pos, None)
+        self.chunkgrids.pop(pos, None)
+        self.__dropZoomed([pos])
+        if pos in self.animated:
+            for gid in self.animated.pop(pos):
+                self.animationframes.pop((pos, gid), None)
+
+        return blocks
+    def stream(self, camera, margin=1):# tuple
+        """
+        bake every chunk within 'margin' chunks around the camera's viewport
+        and drop chunks that are more than one chunk further away. returns a
+        tuple of two lists: the block rects that were loaded and the ones
+        that were dropped.
+        """
+        if not self.streaming:
+            return [], []
+        view = camera.viewport
+        w, h = self.chunksize
+        left = view.left // w - margin
+        top = view.top // h - margin
+        right = (view.right - 1) // w + margin
+        bottom = (view.bottom - 1) // h + margin
+        added = []
+        removed = []
+        # dropping far away chunks. one extra chunk keeps them from being
+        # reloaded over and over at the edge
+        for pos in list(self.loaded):
+            if (
+                pos[0] < left - 1 or pos[0] > right + 1 or
+                pos[1] < top - 1 or pos[1] > bottom + 1
+            ):
+                removed += self.__unloadChunk(pos)
+        # baking chunks coming into range
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                if (x, y) not in self.loaded:
+                    added += self.__loadChunk((x, y))
+
+        return added, removed
+    def __findAnimated(self, grid, flags):# dict
+        """
+        return a dict with the positions of every animated tile placed on
+        the grid.
+        """
+        animated = {}
+        if not self.tiles.animations:
+            return animated
+        mask = np.isin(grid, list(self.tiles.animations))
+        # invisible tiles are never drawn
+        mask &= self.tiles.visible[grid]
+
+        for gid in np.unique(grid[mask]).tolist():
+            rows, cols = np.nonzero(grid == gid)
+            animated[gid] = (rows, cols, flags[rows, cols])
+
+        return animated
+    def animate(self, ticks=None):# list
+        """
+        redraw the cells of every animated tile that changed its frame since
+        the last call. only these tile rects are cleared and drawn again, the
+        rest of the layer stays untouched. chunks of baked layers share their
+        pixels with the layer so they are updated as well. returns a list of
+        the redrawn tile rects in map coordinates.
+        'ticks' time in milliseconds. defaults to 'pygame.time.get_ticks()'.
+        """
+        if ticks is None:
+            ticks = pg.time.get_ticks()
+        w, h = self.tilesize
+        redrawn = []
+
+        for pos, animated in self.animated.items():
+            # streamed chunks are drawn to directly. sparse layers show the
+            # new frame with their next draw
+            if pos is None:
+                surface = None if self.sparse else self
+                offset = (0, 0)
+            elif pos in self.chunks:
+                surface = self.chunks[pos]
+                offset = (
+                    pos[0] * self.chunksize[0],
+                    pos[1] * self.chunksize[1]
+                )
+            else:
+                continue
+            for gid, (rows, cols, flags) in animated.items():
+                frame = self.tiles.getAnimationFrame(gid, ticks)
+                if self.animationframes.get((pos, gid)) == frame:
+                    continue
+                self.animationframes[(pos, gid)] = frame
+                blits = []
+                cells = zip(rows.tolist(), cols.tolist(), flags.tolist())
+                for y, x, flag in cells:
+                    rect = pg.Rect(x * w, y * h, w, h)
+                    redrawn.append(rect.move(offset))
+                    if surface is not None:
+                        surface.fill((0, 0, 0, 0), rect)
+                        blits.append((self.tiles.getFrame(frame, flag), rect))
+                if surface is None:
+                    continue
+                surface.blits(blits, False)
+                # scaled chunks showing these tiles are outdated now
+                if self.zoomed:
+                    if pos is None:
+                        _, (cw, ch) = self.__getDrawChunks()
+                        self.__dropZoomed(set(
+                            (x * w // cw, y * h // ch)
+                            for x, y in zip(cols.tolist(), rows.tolist())
+                        ))
+                    else:
+                        self.__dropZoomed([pos])
+
+        return redrawn
     def __createObjects(self):
         """from a config dict of a 'tiled'-map create interactive objects."""
         objects = []
@@ -181,9 +1061,273 @@ class Layer(pg.Surface):
                 objects.append(EventArea(obj))
 
         return objects
+    def __getArea(self, rect):# numpy.ndarray
+        """
+        return the tile ids inside of 'rect' without their flip flags. the
+        rect is given in cells. cells outside of the layer are 0. grid files
+        and chunks are only read where the rect is.
+        """
+        rect = pg.Rect(rect)
+        area = np.zeros((rect.height, rect.width), dtype=np.uint32)
+        if self.grid is not None:
+            found = rect.clip(
+                pg.Rect(0, 0, self.grid.shape[1], self.grid.shape[0])
+            )
+            area[
+                found.top - rect.top:found.bottom - rect.top,
+                found.left - rect.left:found.right - rect.left
+            ] = self.grid[found.top:found.bottom, found.left:found.right]
+            return area & GIDMASK
+        # infinite maps
+        w, h = self.chunktiles
+        for y in range(rect.top // h, (rect.bottom - 1) // h + 1):
+            for x in range(rect.left // w, (rect.right - 1) // w + 1):
+                if (x, y) in self.chunkgrids:
+                    grid = self.chunkgrids[(x, y)]
+                else:
+                    grid = self.__getChunkData((x, y))
+                    if grid is None:
+                        continue
+                found = rect.clip(
+                    pg.Rect(x * w, y * h, grid.shape[1], grid.shape[0])
+                )
+                area[
+                    found.top - rect.top:found.bottom - rect.top,
+                    found.left - rect.left:found.right - rect.left
+                ] = grid[
+                    found.top - y * h:found.bottom - y * h,
+                    found.left - x * w:found.right - x * w
+                ]
+
+        return area & GIDMASK
+    def getMask(self, name, value=True, rect=None):# numpy.ndarray
+        """
+        return a 2d numpy array of bools. 'true' for every cell holding a tile
+        whose property 'name' equals 'value'. 'rect' limits the mask to that
+        region, given in cells. streamed layers need one, so grid files and
+        chunks are only read where it is. raises 'ValueError' otherwise.
+        usage:
+        water = layer.getMask("name", "water")
+        water = layer.getMask("name", "water", (0, 0, 64, 64))
+        """
+        mask = self.tiles.getMask(name, value)
+        if rect is not None:
+            return mask[self.__getArea(rect)]
+        if self.streaming:
+            raise ValueError(
+                "streamed layer needs a region to mask: " + self.name
+            )
+
+        return mask[self.grid]
+    def getCell(self, pos):# int
+        """
+        return the tile id at the cell position (x, y). 0 if the cell is
+        empty or outside of the layer. grid files and chunks are only read
+        where the cell is.
+        """
+        x, y = pos
+        if self.grid is not None:
+            if 0 <= y < self.grid.shape[0] and 0 <= x < self.grid.shape[1]:
+                return int(self.grid[y, x]) & GIDMASK
+            return 0
+        # infinite maps
+        w, h = self.chunktiles
+        chunk = (x // w, y // h)
+        if chunk in self.chunkgrids:
+            grid = self.chunkgrids[chunk]
+        else:
+            grid = self.__getChunkData(chunk)
+            if grid is None:
+                return 0
+        return int(grid[y % h, x % w]) & GIDMASK
+    def getBlockedCells(self, rect):# list
+        """
+        return a list of (x, y) cell positions that are blocked inside of
+        'rect'. the rect is given in cells, not in pixels. layers with a grid
+        file only read that region of it.
+        """
+        if self.blockmask is not None:
+            return getCells(self.blockmask, rect)
+        if self.grid is None:
+            return []
+        rect = pg.Rect(rect).clip(
+            pg.Rect(0, 0, self.grid.shape[1], self.grid.shape[0])
+        )
+        area = self.grid[rect.top:rect.bottom, rect.left:rect.right]
+        blocked = self.tiles.block[np.asarray(area) & GIDMASK]
+
+        return [
+            (x + rect.left, y + rect.top)
+            for y, x in np.argwhere(blocked).tolist()
+        ]
+    def __getDrawChunks(self):# tuple
+        """
+        return the chunks to draw with and their pixel size. layers without
+        chunks are cut into subsurfaces of 'zoomchunksize' the first time
+        they are drawn zoomed.
+        """
+        if self.chunksize:
+            return self.chunks, self.chunksize
+        if not self.zoomchunks:
+            self.zoomchunks = getChunks(self, self.zoomchunksize)
+
+        return self.zoomchunks, self.zoomchunksize
+    def __getZoomed(self, pos, chunk, zoom):# pygame.surface
+        """
+        return a chunk scaled by 'zoom'. each chunk is scaled only once per
+        zoom level and then kept in 'zoomed'.
+        """
+        if zoom not in self.zoomed:
+            self.zoomed[zoom] = OrderedDict()
+        cache = self.zoomed[zoom]
+        if pos in cache:
+            cache.move_to_end(pos)
+        else:
+            w, h = chunk.get_size()
+            cache[pos] = pg.transform.scale(chunk, (w * zoom, h * zoom))
+
+        return cache[pos]
+    def __evictZoomed(self, zoom, visible):
+        """
+        drop zoom levels that were not drawn for 'zoomlifetime' draws. the
+        current level keeps only the most recently drawn chunks.
+        """
+        self.drawcount += 1
+        if zoom in self.zoomed:
+            self.zoomused[zoom] = self.drawcount
+            cache = self.zoomed[zoom]
+            while len(cache) > max(visible * 2, 16):
+                cache.popitem(last=False)
+        for level in list(self.zoomed):
+            if self.drawcount - self.zoomused[level] > self.zoomlifetime:
+                del self.zoomed[level]
+                del self.zoomused[level]
+    def __dropZoomed(self, positions):
+        """drop scaled chunks that are outdated."""
+        for _, cache in self.zoomed.items():
+            for pos in positions:
+                cache.pop(pos, None)
+    def draw(self, surface, rect=None):# pg.surface
+        """
+        draw the part of the layer inside of 'rect' to the surface's topleft.
+        sparse layers draw their cells and streamed layers their loaded
+        chunks, so this works for every tile layer.
+        'rect' area in map pixels. defaults to the surface's size.
+        """
+        view = pg.Rect(rect) if rect is not None else surface.get_rect()
+
+        if self.sparse:
+            return self.drawCells(surface, view, (-view.left, -view.top))
+        if not self.streaming:
+            surface.blit(self, (0, 0), view)
+            return surface
+        w, h = self.chunksize
+        surface.blits(
+            [
+                (chunk, (x * w - view.left, y * h - view.top))
+                for (x, y), chunk in self.chunks.items()
+                if view.colliderect((x * w, y * h), chunk.get_size())
+            ],
+            False
+        )
+
+        return surface
+    def drawCells(self, surface, view, offset=(0, 0), zoom=1):# pg.surface
+        """
+        draw the cells of a sparse layer inside of 'view' with a single
+        'blits()'. animated tiles show their current frame.
+        'view' rect in map pixels.
+        'offset' pixel position the map's topleft is drawn to before zooming.
+        'zoom' tiles are drawn from a cache of scaled tiles per zoom level.
+        """
+        w, h = self.tilesize
+        rows, cols, gids, flags = self.cells
+        # cells are sorted by row, so the visible rows are a single slice
+        first, last = np.searchsorted(
+            rows,
+            [view.top // h, (view.bottom - 1) // h + 1]
+        )
+        visible = np.nonzero(
+            (cols[first:last] >= view.left // w) &
+            (cols[first:last] <= (view.right - 1) // w)
+        )[0] + first
+        blits = []
+        ticks = None
+
+        for y, x, gid, flag in zip(
+            rows[visible].tolist(),
+            cols[visible].tolist(),
+            gids[visible].tolist(),
+            flags[visible].tolist()
+        ):
+            if gid in self.tiles.animations:
+                if (None, gid) not in self.animationframes:
+                    if ticks is None:
+                        ticks = pg.time.get_ticks()
+                    self.animationframes[(None, gid)] = (
+                        self.tiles.getAnimationFrame(gid, ticks)
+                    )
+                gid = self.animationframes[(None, gid)]
+            image = self.tiles.getFrame(gid, flag)
+            if zoom != 1:
+                image = self.__getZoomed((gid, flag), image, zoom)
+            blits.append((
+                image,
+                ((x * w + offset[0]) * zoom, (y * h + offset[1]) * zoom)
+            ))
+        surface.blits(blits, False)
+        if zoom != 1:
+            self.__evictZoomed(zoom, len(blits))
+
+        return surface
+    def drawChunks(self, surface, camera):
+        """
+        draw only the chunks that intersect with the camera's viewport. if the
+        layer has no chunks, only the visible area of the layer is drawn. when
+        the camera is zoomed the chunks are drawn from a cache of scaled
+        chunks per zoom level. sparse layers draw their visible cells.
+        """
+        view = camera.viewport
+        zoom = camera.zoomfactor
+
+        if self.sparse:
+            return self.drawCells(
+                surface,
+                view,
+                (camera.left, camera.top),
+                zoom
+            )
+        if not self.chunksize and zoom == 1:
+            surface.blit(self, (0, 0), view)
+            return surface
+        # range of chunks the viewport covers
+        chunks, (w, h) = self.__getDrawChunks()
+        left = view.left // w
+        top = view.top // h
+        right = (view.right - 1) // w
+        bottom = (view.bottom - 1) // h
+
+        blits = []
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                if (x, y) in chunks:
+                    chunk = chunks[(x, y)]
+                    if zoom != 1:
+                        chunk = self.__getZoomed((x, y), chunk, zoom)
+                    blits.append((
+                        chunk,
+                        (
+                            (x * w + camera.left) * zoom,
+                            (y * h + camera.top) * zoom
+                        )
+                    ))
+        surface.blits(blits, False)
+        self.__evictZoomed(zoom, len(blits))
+
+        return surface
 class Tileset(pg.Surface):
     """spritesheet object. can be drawn to a surface for preview purpose."""
-    def __init__(self, name):
+    def __init__(self, name, cache=True):
         """
         opens a tileset by the given name. the opened file is JSON-file that
         holds all information for initiating this tileset object.
@@ -192,49 +1336,437 @@ class Tileset(pg.Surface):
             appended through opening the tileset as an asset like in
             'loadAssets(path + name)'.
         'tilesize' most commonly its 16x16 or 32x32.
-        'tiles' is a list of all the tiles cut out from the image.
+        'frames' list of every tile image cut out from the image.
+        'ids', 'block', 'visible', 'names' parallel arrays holding the
+            properties of each tile. the index is the tile id.
+        'properties' dict of any other tile properties by tile id.
+        'transformed' cache of flipped tile images by (id, flags).
+        'animations' dict of animated tiles by tile id. each is a list of
+            (tile id, duration) frames.
+        'sources' list of files this tileset is built from.
+        'cachepath' path to the compiled cache file holding the config and
+            the raw pixels of the tileset. if 'cache' is 'true' it is used
+            and rebuilt as soon as one of the sources changes.
         """
-        # combining path and name to open assets from that path
-        for each in loadAssets(PATH["tilesets"] + "\\" + name):
-            if each["type"] == "tileset":
-                self.config = each# dict
+        self.cachepath = (# str
+            PATH["tilesets"] + "\\" + name + "\\" + name + ".npz"
+        )
+        if cache:
+            cache = loadCache(self.cachepath)# dict / none
+        if cache:
+            self.config = json.loads(str(cache["config"]))# dict
+            self.image = pg.image.frombytes(# pygame.surface
+                cache["pixels"].tobytes(),
+                tuple(cache["size"].tolist()),
+                "RGBA"
+            )
+        else:
+            # combining path and name to open assets from that path
+            for each in loadAssets(PATH["tilesets"] + "\\" + name):
+                if each["type"] == "tileset":
+                    self.config = each# dict
+            self.image = pg.image.load(# pygame.surface
+                self.config["filepath"] + "\\" + self.config["image"]
+            )
         # additional attributes
         self.name = self.config["name"]# str
         self.path = self.config["filepath"]# str
-        self.image = pg.image.load(# pygame.surface
+        self.sources = [# list
+            self.config["path"],
             self.path + "\\" + self.config["image"]
-        )
+        ]
+        if cache is None:
+            saveCache(
+                self.cachepath,
+                self.sources,
+                config=np.array(json.dumps(self.config)),
+                pixels=np.frombuffer(
+                    pg.image.tobytes(self.image, "RGBA"),
+                    dtype=np.uint8
+                ),
+                size=np.array(self.image.get_size())
+            )
+        # the cache keeps the raw pixels, the tileset the display format
+        self.image = prepareImage(self.image)# pygame.surface
         self.tilesize = (# tuple
             self.config["tilewidth"],
             self.config["tileheight"]
         )
-        self.tiles = self.__createTiles()# list
+        self.frames = getFrames(self.image, self.tilesize)# list
+        # tilesets built before the display, like by a 'MapLoader', are
+        # converted later
+        holdImages(self)
+        self.ids = np.arange(len(self.frames))# numpy.ndarray
+        self.block = np.zeros(len(self.frames), dtype=bool)# numpy.ndarray
+        self.visible = np.ones(len(self.frames), dtype=bool)# numpy.ndarray
+        self.names = np.full(# numpy.ndarray
+            len(self.frames),
+            "NoNameTile",
+            dtype=object
+        )
+        self.properties = {}# dict
+        self.transformed = {}# dict
+        self.animations = {}# dict
+        self.__readProperties()
         # display related stuff
         pg.Surface.__init__(self, self.image.get_rect().size, pg.SRCALPHA)
         draw(self.image, self)
-    def __createTiles(self):# list
-        """
-        return a list of all tiles in the given tileset-image.
-        'cfg' will hold additional properties. these will be added to a
-        config-dict that is used to create a tile object.
-        """
-        tilelist = []
-        for i, each in enumerate(getFrames(self.image, self.tilesize), 0):
-            # this is food for a new tile object
-            cfg = {
-                "name": "NoNameTile",
-                "image": each,
-                "id": i,
-                "block": False,
-            }
-            # additional tile properties
-            for props in self.config["tiles"]:
-                if props["id"] == i:
-                    for property in props["properties"]:
-                        cfg[property["name"]] = property["value"]
-            # appending to the resulting list
-            tilelist.append(Tile(cfg))
-        return tilelist
+    def __len__(self):# int
+        """return the number of tiles in this tileset."""
+        return len(self.frames)
+    def __readProperties(self):
+        """
+        fill the property arrays in a single pass over the tile properties of
+        the tileset's config.
+        """
+        for props in self.config["tiles"]:
+            i = props["id"]
+            if i >= len(self.frames):
+                continue
+            # animation frames as (tile id, duration in ms). animations
+            # without any duration never change their frame
+            if "animation" in props and any(
+                frame["duration"] > 0 for frame in props["animation"]
+            ):
+                self.animations[i] = [
+                    (frame["tileid"], frame["duration"])
+                    for frame in props["animation"]
+                ]
+            if "properties" not in props:
+                continue
+            for property in props["properties"]:
+                if property["name"] == "block":
+                    self.block[i] = property["value"]
+                elif property["name"] == "visible":
+                    self.visible[i] = property["value"]
+                elif property["name"] == "name":
+                    self.names[i] = property["value"]
+                else:
+                    if i not in self.properties:
+                        self.properties[i] = {}
+                    self.properties[i][property["name"]] = property["value"]
+    def prepareImages(self):
+        """
+        convert the tileset's image to the display's format once a display
+        exists and cut the frames out of it again. see 'holdImages()'.
+        """
+        self.image = prepareImage(self.image)
+        self.frames = getFrames(self.image, self.tilesize)
+        self.transformed = {}
+    def getFrame(self, id, flags=0):# pygame.surface
+        """
+        return the image of a tile. if 'flags' holds any flip flags the image
+        is transformed once and then kept in 'transformed'.
+        """
+        if not flags:
+            return self.frames[id]
+        if (id, flags) not in self.transformed:
+            self.transformed[(id, flags)] = flipTile(self.frames[id], flags)
+
+        return self.transformed[(id, flags)]
+    def getTile(self, id):# tile
+        """return a tile object for the tile with that id."""
+        cfg = {
+            "name": self.names[id],
+            "image": self.frames[id],
+            "id": id,
+            "block": bool(self.block[id]),
+            "visible": bool(self.visible[id])
+        }
+        if id in self.properties:
+            cfg.update(self.properties[id])
+
+        return Tile(cfg)
+class TileTable:
+    """
+    flat lookup table of tiles from one or more tilesets. every property is
+    held in a parallel array indexed by the global tile id (gid) as used in
+    'tiled'-maps. each tileset starts at its 'firstgid'. so a whole grid of
+    tile ids can be resolved at once. index 0 stands for an empty cell.
+    usage:
+    blocked = table.block[layer.grid]
+    """
+    def __init__(self, tilesets=[]):
+        """
+        'tilesets' list of (firstgid, tileset) pairs. after initiating it's a
+            list of the tilesets sorted by their firstgid.
+        'firstgids' list of the tilesets' firstgids in the same order.
+        'frames' list of tile images. 'none' for empty or unused ids.
+        'ids' tile id inside of its tileset.
+        'owners' index of the tileset in 'tilesets' each tile comes from. -1
+            for empty or unused ids.
+        'block', 'visible', 'names' parallel arrays of tile properties.
+        'properties' list of dicts with additional tile properties.
+        'animations' dict of animated tiles by tile id. each is a list of
+            (tile id, duration) frames.
+        'collision' array of each tile's collision categories as bits. see
+            'COLLISIONS'.
+        """
+        tilesets = sorted(tilesets, key=lambda each: each[0])
+        size = max([1] + [gid + len(tileset) for gid, tileset in tilesets])
+
+        self.tilesets = [tileset for _, tileset in tilesets]# list
+        self.firstgids = [firstgid for firstgid, _ in tilesets]# list
+        self.frames = [None] * size# list
+        self.ids = np.zeros(size, dtype=int)# numpy.ndarray
+        self.owners = np.full(size, -1, dtype=int)# numpy.ndarray
+        self.block = np.zeros(size, dtype=bool)# numpy.ndarray
+        self.visible = np.zeros(size, dtype=bool)# numpy.ndarray
+        self.names = np.full(size, None, dtype=object)# numpy.ndarray
+        self.properties = [{}] * size# list
+        self.animations = {}# dict
+        # copying every tileset to its range of ids
+        for i, (firstgid, tileset) in enumerate(tilesets):
+            last = firstgid + len(tileset)
+            self.frames[firstgid:last] = tileset.frames
+            self.ids[firstgid:last] = tileset.ids
+            self.owners[firstgid:last] = i
+            self.block[firstgid:last] = tileset.block
+            self.visible[firstgid:last] = tileset.visible
+            self.names[firstgid:last] = tileset.names
+            for id, props in tileset.properties.items():
+                self.properties[firstgid + id] = props
+            for id, frames in tileset.animations.items():
+                self.animations[firstgid + id] = [
+                    (firstgid + frame, duration)
+                    for frame, duration in frames
+                ]
+        self.collision = self.__getCollision()# numpy.ndarray
+        # tables built before the display take the converted frames later
+        holdImages(self)
+    def __getCollision(self):# numpy.ndarray
+        """
+        return an array of each tile's collision bits. blocking tiles get the
+        'block' bit. further categories come from a 'collision' property
+        listing category names separated by commas.
+        """
+        collision = np.zeros(len(self.frames), dtype=np.uint8)
+        collision[self.block] = COLLISIONS["block"]
+
+        for gid, props in enumerate(self.properties):
+            if "collision" in props:
+                for name in str(props["collision"]).split(","):
+                    name = name.strip()
+                    if name in COLLISIONS:
+                        collision[gid] |= COLLISIONS[name]
+        collision[0] = 0
+
+        return collision
+    def __len__(self):# int
+        """return the number of ids including the empty one."""
+        return len(self.frames)
+    def refresh(self):
+        """
+        copy the tile images from the tilesets again. call it after their
+        frames have been replaced, like by packing them into an 'Atlas'.
+        """
+        for firstgid, tileset in zip(self.firstgids, self.tilesets):
+            self.frames[firstgid:firstgid + len(tileset)] = tileset.frames
+    def prepareImages(self):
+        """
+        take the converted frames of the tilesets once a display exists.
+        tables are built after their tilesets, so those are converted
+        first. see 'holdImages()'.
+        """
+        self.refresh()
+    def getMask(self, name, value=True):# numpy.ndarray
+        """
+        return an array of bools telling which tiles have a property 'name'
+        that equals 'value'. index it with a grid of tile ids to get a mask:
+        water = table.getMask("name", "water")[grid]
+        """
+        if name == "block":
+            mask = self.block == value
+        elif name == "visible":
+            mask = self.visible == value
+        elif name == "name":
+            mask = self.names == value
+        else:
+            mask = np.array(
+                [
+                    name in props and props[name] == value
+                    for props in self.properties
+                ],
+                dtype=bool
+            )
+        # the empty cell never matches
+        mask[0] = False
+
+        return mask
+    def getAnimationFrame(self, gid, ticks):# int
+        """
+        return the tile id an animated tile shows at 'ticks' milliseconds.
+        """
+        frames = self.animations[gid]
+        ticks = ticks % sum(duration for _, duration in frames)
+
+        for frame, duration in frames:
+            if ticks < duration:
+                return frame
+            ticks -= duration
+
+        return frames[-1][0]
+    def getFrame(self, gid, flags=0):# pygame.surface
+        """
+        return the image for that tile id. flipped images come from the
+        tileset's cache of transformed tiles.
+        """
+        if not flags:
+            return self.frames[gid]
+
+        return self.tilesets[self.owners[gid]].getFrame(self.ids[gid], flags)
+    def getTile(self, gid):# tile / none
+        """return a tile object for that tile id or 'none' if it's empty."""
+        if self.owners[gid] == -1:
+            return None
+        cfg = {
+            "name": self.names[gid],
+            "image": self.frames[gid],
+            "id": int(self.ids[gid]),
+            "block": bool(self.block[gid]),
+            "visible": bool(self.visible[gid])
+        }
+        cfg.update(self.properties[gid])
+
+        return Tile(cfg)
+class TilesetRegistry:
+    """
+    process-wide store of built tilesets. maps acquire their tilesets from
+    here, so maps sharing the same art don't load and cut them again.
+    tilesets are reference-counted. unreferenced ones stay cached and are
+    evicted least recently used first as soon as they use more memory than
+    the 'budget'.
+    usage:
+    TILESETS.budget = 128 * 1024 * 1024
+    """
+    default = {
+        "budget": 64 * 1024 * 1024
+    }
+    def __init__(self, config={}):
+        """
+        'budget' maximal memory in bytes unreferenced tilesets may use.
+            referenced tilesets are never evicted.
+        'tilesets' ordered dict of cached tilesets. the least recently used
+            comes first.
+        'references' dict of reference counts by tileset name.
+        'lock' guards the registry, so maps can be loaded from other threads.
+        'loading' dict of locks by tileset name. a tileset that is being
+            built by one thread is waited for instead of being built twice.
+        """
+        self.config = validateDict(config, self.default)# dict
+        self.budget = self.config["budget"]# int
+        self.tilesets = OrderedDict()# ordereddict
+        self.references = {}# dict
+        self.lock = threading.RLock()# rlock
+        self.loading = {}# dict
+    def __contains__(self, name):# bool
+        """return 'true' if a tileset with that name is cached."""
+        return name in self.tilesets
+    @property# int
+    def size(self):
+        """return the estimated memory of all cached tilesets in bytes."""
+        with self.lock:
+            return sum(
+                self.getSize(tileset)
+                for _, tileset in self.tilesets.items()
+            )
+    @property# int
+    def unused(self):
+        """
+        return the estimated memory of the unreferenced cached tilesets in
+        bytes. this is what has to fit the budget.
+        """
+        with self.lock:
+            return sum(
+                self.getSize(tileset)
+                for name, tileset in self.tilesets.items()
+                if self.references[name] == 0
+            )
+    def getSize(self, tileset):# int
+        """
+        return the estimated memory of a tileset in bytes. it holds the
+        image and a copy of it as its own surface.
+        """
+        return (
+            tileset.get_width() * tileset.get_height() *
+            (tileset.get_bytesize() + tileset.image.get_bytesize())
+        )
+    def acquire(self, name, cache=True):# tileset
+        """
+        return the tileset with that name and raise its reference count. it
+        is only built if it isn't cached yet. different tilesets can be built
+        by several threads at once.
+        """
+        with self.lock:
+            if name not in self.loading:
+                self.loading[name] = threading.Lock()
+            loading = self.loading[name]
+
+        with loading:
+            with self.lock:
+                if name in self.tilesets:
+                    self.tilesets.move_to_end(name)
+                    self.references[name] += 1
+                    return self.tilesets[name]
+            # building outside of the registry lock
+            tileset = Tileset(name, cache)
+            with self.lock:
+                self.tilesets[name] = tileset
+                self.references[name] = 1
+                self.evict()
+
+        return tileset
+    def reload(self, name, cache=True):# tileset / none
+        """
+        build a cached tileset again from its files and put it in place of
+        the old one. its reference count stays the same. maps using it have
+        to be handed the new one, see 'Map.setTileset()'. returns 'none' if
+        no tileset with that name is cached.
+        """
+        with self.lock:
+            if name not in self.tilesets:
+                return None
+            loading = self.loading[name]
+
+        with loading:
+            tileset = Tileset(name, cache)
+            with self.lock:
+                if name not in self.tilesets:
+                    return None
+                self.tilesets[name] = tileset
+                self.evict()
+
+        return tileset
+    def release(self, name):
+        """lower the reference count of a tileset."""
+        with self.lock:
+            if name in self.references and self.references[name] > 0:
+                self.references[name] -= 1
+            self.evict()
+    def evict(self):
+        """
+        drop unreferenced tilesets, least recently used first, until the
+        unreferenced ones fit the budget again.
+        """
+        with self.lock:
+            size = self.unused
+
+            for name in list(self.tilesets):
+                if size <= self.budget:
+                    break
+                if self.references[name] == 0:
+                    size -= self.getSize(self.tilesets[name])
+                    del self.tilesets[name]
+                    del self.references[name]
+    def clear(self):
+        """drop every unreferenced tileset regardless of the budget."""
+        with self.lock:
+            for name in list(self.tilesets):
+                if self.references[name] == 0:
+                    del self.tilesets[name]
+                    del self.references[name]
+# shared by every map
+TILESETS = TilesetRegistry()
 class Tile(pg.sprite.Sprite):
 	"""cut out a sprite from an image. actually its just displacement though."""
 	default = {
@@ -281,6 +1813,8 @@ class EventArea(pg.Rect):
         'visible' can use this as a condition.
         'state' returns the state this event is in. if 'done' it cannot be used
             anymore. on 'ready' its waiting to get called.
+        'callback' the function registered for 'name' in 'EVENTS'. it's
+            looked up once when the map is loaded.
         """
         self.config = config# dict
         # initiating pygame rect
@@ -294,8 +1828,118 @@ class EventArea(pg.Rect):
         self.trigger = ""# str
         self.visible = config["visible"]# bool
         self.state = "ready"# str
+        self.callback = None# none / function
         # if there are additional properties in the map
         if config["properties"]:
             for prop in config["properties"]:
                 if prop["name"] == "trigger":
                     self.trigger = prop["value"]
+class EventRegistry:
+    """
+    dict of functions event areas can call by their name. register functions
+    before loading a map. usage:
+    @EVENTS.register("openDoor")
+    def openDoor(area, entity):
+        area.state = "done"
+    or:
+    EVENTS.register("openDoor", openDoor)
+    """
+    def __init__(self):
+        """'functions' dict of registered functions by name."""
+        self.functions = {}# dict
+    def __contains__(self, name):# bool
+        """return 'true' if a function is registered for that name."""
+        return name in self.functions
+    def register(self, name, function=None):# function
+        """
+        register a function for that name. without a function it returns a
+        decorator.
+        """
+        def decorator(function):
+            self.functions[name] = function
+            return function
+
+        if function is None:
+            return decorator
+
+        return decorator(function)
+    def get(self, name):# function / none
+        """return the function registered for that name or 'none'."""
+        return self.functions.get(name)
+# shared by every map
+EVENTS = EventRegistry()
+class Triggers:
+    """
+    fires the functions of event areas when entities enter, leave or interact
+    with them. areas are indexed by the grid cells they cover, so an update
+    only looks at entities that moved to another cell and at the areas of
+    that cell. an entity is inside of an area when its center cell touches
+    the area. the area's 'trigger' decides which transition fires it:
+    'enter', 'leave' or 'interact'. functions are called with the area and
+    the entity. areas in state 'done' are ignored.
+    """
+    def __init__(self, areas=[], cellsize=(32, 32)):
+        """
+        'cellsize' size of a grid cell. the map's tilesize works best.
+        'cells' dict of lists with the areas covering each cell position.
+        'positions' dict of the last cell of each entity.
+        'inside' dict of lists with the areas each entity is inside of.
+        """
+        self.cellsize = tuple(cellsize)# tuple
+        self.cells = {}# dict
+        self.positions = {}# dict
+        self.inside = {}# dict
+        for area in areas:
+            self.add(area)
+    def add(self, area):
+        """
+        add an event area to the index and look up its function once.
+        """
+        area.callback = EVENTS.get(area.name)
+        w, h = self.cellsize
+        for y in range(area.top // h, (area.bottom - 1) // h + 1):
+            for x in range(area.left // w, (area.right - 1) // w + 1):
+                if (x, y) in self.cells:
+                    self.cells[(x, y)].append(area)
+                else:
+                    self.cells[(x, y)] = [area]
+    def fire(self, area, trigger, entity):
+        """call the area's function if it waits for that trigger."""
+        if (
+            area.callback and
+            area.trigger == trigger and
+            area.state != "done"
+        ):
+            area.callback(area, entity)
+    def update(self, entities):
+        """
+        fire 'enter' and 'leave' for every entity that moved to another cell
+        since the last update. call it with each game loop.
+        """
+        w, h = self.cellsize
+
+        for entity in entities:
+            cell = (entity.rect.centerx // w, entity.rect.centery // h)
+            if self.positions.get(entity) == cell:
+                continue
+            self.positions[entity] = cell
+            old = self.inside.get(entity, [])
+            new = self.cells.get(cell, [])
+            self.inside[entity] = new
+            # areas are rects, so they're compared by identity
+            oldids = set(id(area) for area in old)
+            newids = set(id(area) for area in new)
+            for area in old:
+                if id(area) not in newids:
+                    self.fire(area, "leave", entity)
+            for area in new:
+                if id(area) not in oldids:
+                    self.fire(area, "enter", entity)
+    def interact(self, entity):
+        """fire 'interact' for every area the entity is inside of."""
+        for area in self.inside.get(entity, []):
+            self.fire(area, "interact", entity)
+    def forget(self, entity):
+        """stop tracking an entity. for example when it's removed."""
+        self.positions.pop(entity, None)
+        self.inside.pop(entity, None)
@@ -0,0 +1,834 @@
+from .utils import validateDict, COLLISIONS
+import numpy as np
+import heapq
+import time
+from collections import OrderedDict, deque
+
+class Pathfinder:
+    """
+    finds paths of cells through a collision grid with hierarchical a*. the
+    grid is cut into clusters. cells where two clusters can be crossed are
+    found once as entrances, one for each pair of connected areas the border
+    joins. paths are searched on the small graph of entrances first and
+    only then refined cell by cell inside of the clusters the path goes
+    through. recent paths are kept in a cache, which forgets every path
+    through a cluster whose cells change. usage:
+    pathfinder = Pathfinder(map.collision)
+    path = pathfinder.findPath((2, 3), (120, 48))
+    or spread many requests over several frames. a single search is paused
+    and resumed as well, so no frame takes longer than the budget:
+    pathfinder.request((2, 3), (120, 48), npc.follow)
+    # with each game loop
+    pathfinder.process(2)
+    """
+    default = {
+        "clustersize": 16,
+        "categories": "block",
+        "cachesize": 256
+    }
+    def __init__(self, grid, config={}):
+        """
+        'grid' the map's 'CollisionGrid'. the pathfinder listens to its
+            changes.
+        'config' validated dict of properties.
+            'clustersize' width and height of a cluster in cells.
+            'categories' collision categories that can't be walked on.
+            'cachesize' number of paths kept in the cache.
+        'walkable' 2d numpy array of bools. 'true' for cells that can be
+            walked on.
+        'areas' 2d numpy array labeling the connected walkable cells inside
+            of each cluster. cells of one area share a label. -1 for cells
+            that can't be walked on.
+        'clusters' number of clusters (columns, rows).
+        'borders' dict of entrances by the pair of neighbouring clusters.
+            each entrance is a pair of cells facing each other.
+        'nodes' dict of the entrance cells of each cluster.
+        'links' dict of the cells across the border for each entrance cell.
+        'edges' dict of the walking distances between the entrance cells of
+            each cluster. they are measured the first time a cluster is
+            searched through.
+        'graph' dict of (cell, distance) lists for every measured entrance
+            cell. these are its edges plus the cells across the border.
+        'fields' dict of the distance fields of each measured cluster. paths
+            between entrances are read from them.
+        'distances' flat scratch array for growing wavefronts. it's -1
+            everywhere between two measurements.
+        'paths' least recently used cache of found paths by (start, goal).
+        'pathclusters' dict of the clusters each cached path goes through.
+        'requests' queue of (start, goal, callback) waiting for 'process()'.
+        'search' the paused search of the first request or 'none'.
+        """
+        self.config = validateDict(config, self.default)# dict
+        self.grid = grid# collisiongrid
+        self.clustersize = self.config["clustersize"]# int
+        bits = self.config["categories"]
+        if type(bits) is str:
+            bits = [bits]
+        if type(bits) is not int:
+            bits = sum(COLLISIONS[name] for name in set(bits))
+        self.bits = bits# int
+        self.paths = OrderedDict()# ordereddict
+        self.pathclusters = {}# dict
+        self.requests = deque()# deque
+        self.search = None# none / generator
+        self.__build()
+        self.grid.listeners.append(self.update)
+    def __build(self):
+        """read the whole grid and find the entrances of every cluster."""
+        self.walkable = (self.grid.mask & self.bits) == 0# numpy.ndarray
+        self.areas = np.full(self.walkable.shape, -1, dtype=np.int32)# ndarray
+        self.clusters = (# tuple
+            -(-self.grid.size[0] // self.clustersize),
+            -(-self.grid.size[1] // self.clustersize)
+        )
+        self.borders = {}# dict
+        self.nodes = {}# dict
+        self.links = {}# dict
+        self.edges = {}# dict
+        self.graph = {}# dict
+        self.fields = {}# dict
+        self.distances = np.full(self.walkable.size, -1, dtype=np.int32)
+        self.__label((0, 0) + tuple(self.grid.size))
+        for y in range(self.clusters[1]):
+            for x in range(self.clusters[0]):
+                self.__buildBorder((x, y), (x + 1, y))
+                self.__buildBorder((x, y), (x, y + 1))
+        self.__buildNodes(self.__getAllClusters())
+    def __getAllClusters(self):# list
+        """return every cluster position."""
+        return [
+            (x, y)
+            for y in range(self.clusters[1])
+            for x in range(self.clusters[0])
+        ]
+    def __getCluster(self, cell):# tuple
+        """return the position of the cluster a cell is in."""
+        return (cell[0] // self.clustersize, cell[1] // self.clustersize)
+    def __getBounds(self, cluster):# tuple
+        """return the cells (left, top, right, bottom) a cluster spans."""
+        size = self.clustersize
+        return (
+            cluster[0] * size,
+            cluster[1] * size,
+            min((cluster[0] + 1) * size, self.grid.size[0]),
+            min((cluster[1] + 1) * size, self.grid.size[1])
+        )
+    def __getRuns(self, line):# list
+        """return (start, end) of every run of 'true' in an array of bools."""
+        edges = np.diff(np.concatenate(([0], line.astype(np.int8), [0])))
+        starts = np.nonzero(edges == 1)[0].tolist()
+        ends = np.nonzero(edges == -1)[0].tolist()
+
+        return list(zip(starts, ends))
+    def __label(self, bounds):
+        """
+        label the connected walkable cells of every cluster inside of
+        'bounds' (left, top, right, bottom), which are given in cells and
+        lie on cluster borders. each cell takes the smallest label of its
+        neighbours in the same cluster and then the label of the cell its
+        label points to, until nothing changes anymore.
+        """
+        left, top, right, bottom = bounds
+        area = self.walkable[top:bottom, left:right]
+        height, width = area.shape
+        size = self.clustersize
+        blocked = height * width
+        ys, xs = np.mgrid[top:bottom, left:right]
+        labels = np.where(
+            area,
+            np.arange(blocked).reshape(height, width),
+            blocked
+        )
+        # neighbours that are walked to without leaving the cluster
+        across = area[:, :-1] & area[:, 1:] & (xs[:, 1:] % size != 0)
+        down = area[:-1, :] & area[1:, :] & (ys[1:, :] % size != 0)
+
+        while True:
+            new = labels.copy()
+            np.minimum(
+                new[:, :-1],
+                np.where(across, labels[:, 1:], blocked),
+                out=new[:, :-1]
+            )
+            np.minimum(
+                new[:, 1:],
+                np.where(across, labels[:, :-1], blocked),
+                out=new[:, 1:]
+            )
+            np.minimum(
+                new[:-1, :],
+                np.where(down, labels[1:, :], blocked),
+                out=new[:-1, :]
+            )
+            np.minimum(
+                new[1:, :],
+                np.where(down, labels[:-1, :], blocked),
+                out=new[1:, :]
+            )
+            new = np.append(new.ravel(), blocked)[new]
+            if np.array_equal(new, labels):
+                break
+            labels = new
+        # labels of the whole grid, so areas of clusters never share one
+        self.areas[top:bottom, left:right] = np.where(
+            area,
+            (labels // width + top) * self.grid.size[0] +
+            labels % width + left,
+            -1
+        )
+    def __buildBorder(self, a, b):
+        """
+        find the entrances between cluster 'a' and cluster 'b' to the right
+        of or below it. open parts of the border joining the same two areas
+        share one entrance in the middle of the widest of them.
+        """
+        self.borders.pop((a, b), None)
+        if (
+            a[0] < 0 or a[1] < 0 or
+            b[0] >= self.clusters[0] or b[1] >= self.clusters[1]
+        ):
+            return
+        left, top, right, bottom = self.__getBounds(a)
+        # vertical border between left and right cluster
+        if b[0] != a[0]:
+            line = self.walkable[top:bottom, right - 1] & (
+                self.walkable[top:bottom, right]
+            )
+            cells = lambda i: ((right - 1, top + i), (right, top + i))
+        # horizontal border between upper and lower cluster
+        else:
+            line = self.walkable[bottom - 1, left:right] & (
+                self.walkable[bottom, left:right]
+            )
+            cells = lambda i: ((left + i, bottom - 1), (left + i, bottom))
+        widest = {}
+        for start, end in self.__getRuns(line):
+            first, second = cells(start)
+            key = (
+                self.areas[first[1], first[0]],
+                self.areas[second[1], second[0]]
+            )
+            if key not in widest or end - start > widest[key][0]:
+                widest[key] = (end - start, cells((start + end - 1) // 2))
+        if widest:
+            self.borders[(a, b)] = [cell for _, cell in widest.values()]
+    def __buildNodes(self, clusters):
+        """
+        collect the entrance cells and their links of some clusters from
+        the borders again.
+        """
+        clusters = set(clusters)
+
+        for cluster in clusters:
+            for cell in self.nodes.get(cluster, []):
+                self.links.pop(cell, None)
+                self.graph.pop(cell, None)
+            self.nodes[cluster] = set()
+            self.edges.pop(cluster, None)
+            self.fields.pop(cluster, None)
+        for cluster in clusters:
+            x, y = cluster
+            for a, b in (
+                ((x - 1, y), cluster),
+                (cluster, (x + 1, y)),
+                ((x, y - 1), cluster),
+                (cluster, (x, y + 1))
+            ):
+                for first, second in self.borders.get((a, b), []):
+                    cell, other = (
+                        (first, second) if a == cluster else (second, first)
+                    )
+                    self.nodes[cluster].add(cell)
+                    if cell not in self.links:
+                        self.links[cell] = set()
+                    self.links[cell].add(other)
+    def __walk(self, start, bounds, goal=None):# tuple
+        """
+        breadth first search from 'start' inside of 'bounds'. returns the
+        distances and the parent of each reached cell. stops as soon as
+        'goal' is reached if it's given.
+        """
+        left, top, right, bottom = bounds
+        area = self.walkable[top:bottom, left:right].tolist()
+        distances = {start: 0}
+        parents = {start: None}
+        queue = deque([start])
+
+        while queue:
+            cell = queue.popleft()
+            if cell == goal:
+                break
+            x, y = cell
+            for next in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if (
+                    next not in distances and
+                    left <= next[0] < right and
+                    top <= next[1] < bottom and
+                    area[next[1] - top][next[0] - left]
+                ):
+                    distances[next] = distances[cell] + 1
+                    parents[next] = cell
+                    queue.append(next)
+
+        return distances, parents
+    def __spread(self, sources):# tuple
+        """
+        grow wavefronts from flat cell indices over the walkable cells. no
+        front leaves the cluster it starts in. only the cells of the current
+        fronts are looked at in each step. returns the flat indices of every
+        reached cell and their distances to the source of their cluster.
+        """
+        width, height = self.grid.size
+        size = self.clustersize
+        flat = self.walkable.ravel()
+        distances = self.distances
+        front = np.asarray(sources, dtype=np.int64)
+        distances[front] = 0
+        reached = [front]
+        step = 0
+
+        while front.size:
+            step += 1
+            x = front % width
+            y = front // width
+            front = np.concatenate((
+                front[((x + 1) % size != 0) & (x + 1 < width)] + 1,
+                front[x % size != 0] - 1,
+                front[((y + 1) % size != 0) & (y + 1 < height)] + width,
+                front[y % size != 0] - width
+            ))
+            front = np.unique(front[flat[front] & (distances[front] == -1)])
+            distances[front] = step
+            reached.append(front)
+        reached = np.concatenate(reached)
+        steps = distances[reached]
+        # leaving the scratch array clean for the next wavefronts
+        distances[reached] = -1
+
+        return reached, steps
+    def __store(self, cluster, nodes, field):
+        """
+        keep the distance field of a cluster's entrance cells and read the
+        edges between them from it.
+        """
+        left, top, _, _ = self.__getBounds(cluster)
+        self.fields[cluster] = (
+            {node: i for i, node in enumerate(nodes)},
+            field,
+            left,
+            top
+        )
+        self.edges[cluster] = {}
+        for i, node in enumerate(nodes):
+            self.edges[cluster][node] = [
+                (other, int(field[i, other[1] - top, other[0] - left]))
+                for other in nodes
+                if other != node and
+                field[i, other[1] - top, other[0] - left] != -1
+            ] + [(other, 1) for other in self.links.get(node, ())]
+        self.graph.update(self.edges[cluster])
+    def __measure(self, clusters):
+        """
+        measure the walking distances between the entrance cells of many
+        clusters at once. the wavefronts of the first entrance of every
+        cluster are grown together, then those of the second one and so on.
+        """
+        width = self.grid.size[0]
+        columns = self.clusters[0]
+        nodes = {
+            cluster: sorted(self.nodes.get(cluster, ()))
+            for cluster in clusters
+        }
+        fields = {}
+        for cluster in clusters:
+            left, top, right, bottom = self.__getBounds(cluster)
+            fields[cluster] = np.full(
+                (len(nodes[cluster]), bottom - top, right - left),
+                -1,
+                dtype=np.int32
+            )
+        count = max([len(each) for each in nodes.values()] + [0])
+
+        for i in range(count):
+            owners = [each for each in clusters if len(nodes[each]) > i]
+            reached, steps = self.__spread([
+                nodes[cluster][i][1] * width + nodes[cluster][i][0]
+                for cluster in owners
+            ])
+            x = reached % width
+            y = reached // width
+            # sorting the reached cells by their cluster
+            ids = (y // self.clustersize) * columns + x // self.clustersize
+            order = np.argsort(ids, kind="stable")
+            ids = ids[order]
+            keys = [cluster[1] * columns + cluster[0] for cluster in owners]
+            firsts = np.searchsorted(ids, keys, side="left").tolist()
+            lasts = np.searchsorted(ids, keys, side="right").tolist()
+            for cluster, first, last in zip(owners, firsts, lasts):
+                part = order[first:last]
+                left, top, _, _ = self.__getBounds(cluster)
+                fields[cluster][i][y[part] - top, x[part] - left] = steps[part]
+        for cluster in clusters:
+            self.__store(cluster, nodes[cluster], fields[cluster])
+    def __getEdges(self, cluster):# dict
+        """
+        return a list of (cell, distance) for each entrance cell of a
+        cluster. it holds the other entrances it can walk to inside of the
+        cluster and the cells across the border. they are measured only
+        once until the cluster changes. the wavefronts of all entrances of
+        a single cluster are grown at once, one step per loop.
+        """
+        if cluster not in self.edges:
+            left, top, right, bottom = self.__getBounds(cluster)
+            area = self.walkable[top:bottom, left:right]
+            nodes = sorted(self.nodes.get(cluster, ()))
+            field = np.full((len(nodes),) + area.shape, -1, dtype=np.int32)
+            front = np.zeros(field.shape, dtype=bool)
+            for i, (x, y) in enumerate(nodes):
+                front[i, y - top, x - left] = True
+            field[front] = 0
+            step = 0
+            while front.any():
+                step += 1
+                grown = np.zeros(front.shape, dtype=bool)
+                grown[:, 1:, :] |= front[:, :-1, :]
+                grown[:, :-1, :] |= front[:, 1:, :]
+                grown[:, :, 1:] |= front[:, :, :-1]
+                grown[:, :, :-1] |= front[:, :, 1:]
+                front = grown & area & (field == -1)
+                field[front] = step
+            self.__store(cluster, nodes, field)
+
+        return self.edges[cluster]
+    def __descend(self, start, node):# list
+        """
+        return the cells from 'start' to an entrance cell of the same
+        cluster by stepping down the entrance's distance field.
+        """
+        index, distances, left, top = self.fields[self.__getCluster(node)]
+        field = distances[index[node]]
+        height, width = field.shape
+        x, y = start
+        distance = field[y - top, x - left]
+        path = [start]
+
+        while distance > 0:
+            distance -= 1
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if (
+                    0 <= nx - left < width and
+                    0 <= ny - top < height and
+                    field[ny - top, nx - left] == distance
+                ):
+                    x, y = nx, ny
+                    break
+            path.append((x, y))
+
+        return path
+    def __getLocalPath(self, start, goal):# list / none
+        """
+        return the cells from 'start' to 'goal' inside of their cluster or
+        'none' if there's no way inside of it.
+        """
+        _, parents = self.__walk(
+            start,
+            self.__getBounds(self.__getCluster(start)),
+            goal
+        )
+        if goal not in parents:
+            return None
+        path = []
+        cell = goal
+        while cell is not None:
+            path.append(cell)
+            cell = parents[cell]
+
+        return path[::-1]
+    def __search(self, start, goal):# generator
+        """
+        a* over the entrance graph from 'start' to 'goal'. both are linked to
+        the entrance cells of their clusters first. pauses after every
+        expanded cell and returns the cells the path steps over or 'none'.
+        """
+        startcluster = self.__getCluster(start)
+        goalcluster = self.__getCluster(goal)
+        # linking start and goal to the entrances of their clusters
+        startdistances, _ = self.__walk(start, self.__getBounds(startcluster))
+        goaldistances, _ = self.__walk(goal, self.__getBounds(goalcluster))
+        goaledges = {
+            node: goaldistances[node]
+            for node in self.nodes.get(goalcluster, set())
+            if node in goaldistances
+        }
+        gx, gy = goal
+        costs = {start: 0}
+        parents = {start: None}
+        queue = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+        # a direct way inside of the same cluster
+        if goal in startdistances:
+            costs[goal] = startdistances[goal]
+            parents[goal] = start
+            heapq.heappush(queue, (costs[goal], costs[goal], goal))
+
+        while queue:
+            yield
+            _, cost, cell = heapq.heappop(queue)
+            if cell == goal:
+                break
+            if cost > costs[cell]:
+                continue
+            # neighbours in the entrance graph
+            if cell == start:
+                neighbours = [
+                    (node, startdistances[node])
+                    for node in self.nodes.get(startcluster, set())
+                    if node in startdistances
+                ] + [(other, 1) for other in self.links.get(cell, ())]
+            else:
+                neighbours = self.graph.get(cell)
+                # measuring clusters the first time they are searched
+                if neighbours is None:
+                    neighbours = self.__getEdges(
+                        self.__getCluster(cell)
+                    ).get(cell, [])
+                    yield
+            if cell in goaledges:
+                neighbours = neighbours + [(goal, goaledges[cell])]
+            for next, distance in neighbours:
+                total = cost + distance
+                if total < costs.get(next, total + 1):
+                    costs[next] = total
+                    parents[next] = cell
+                    heapq.heappush(
+                        queue,
+                        (
+                            total + abs(next[0] - gx) + abs(next[1] - gy),
+                            total,
+                            next
+                        )
+                    )
+        if goal not in parents:
+            return None
+        waypoints = []
+        cell = goal
+        while cell is not None:
+            waypoints.append(cell)
+            cell = parents[cell]
+
+        return waypoints[::-1]
+    def __refine(self, waypoints):# generator
+        """
+        return every cell of a path along its waypoints. pauses after every
+        piece between two waypoints.
+        """
+        path = [waypoints[0]]
+
+        for first, second in zip(waypoints, waypoints[1:]):
+            cluster = self.__getCluster(second)
+            index = self.fields[cluster][0] if cluster in self.fields else {}
+            # stepping over a border
+            if second in self.links.get(first, ()):
+                path.append(second)
+            # reading the way from the distance field of an entrance
+            elif second in index:
+                path += self.__descend(first, second)[1:]
+            elif first in index:
+                path += self.__descend(second, first)[::-1][1:]
+            else:
+                path += self.__getLocalPath(first, second)[1:]
+            yield
+
+        return path
+    def __find(self, start, goal):# generator
+        """
+        search and refine a path between two walkable cells and cache it.
+        pauses between small steps of work, so a search can be spread over
+        several frames. returns the path or 'none'.
+        """
+        if start == goal:
+            path = [start]
+        else:
+            waypoints = yield from self.__search(start, goal)
+            if waypoints is None:
+                return None
+            path = yield from self.__refine(waypoints)
+        # caching the path together with the clusters it goes through
+        key = (start, goal)
+        self.paths[key] = path
+        self.pathclusters[key] = set(self.__getCluster(cell) for cell in path)
+        while len(self.paths) > self.config["cachesize"]:
+            old, _ = self.paths.popitem(last=False)
+            del self.pathclusters[old]
+
+        return list(path)
+    def __getCached(self, start, goal):# list / none
+        """return a copy of a cached path or 'none'."""
+        key = (start, goal)
+        if key not in self.paths:
+            return None
+        self.paths.move_to_end(key)
+
+        return list(self.paths[key])
+    def isWalkable(self, cell):# bool
+        """return 'true' if the cell (x, y) is inside the grid and free."""
+        x, y = cell
+        return (
+            0 <= x < self.grid.size[0] and
+            0 <= y < self.grid.size[1] and
+            bool(self.walkable[y, x])
+        )
+    def findPath(self, start, goal):# list / none
+        """
+        return a list of (x, y) cells from 'start' to 'goal', both included.
+        returns 'none' if there's no way. entities walk on the 4 direct
+        neighbours of a cell only. the whole search is done at once.
+        """
+        start, goal = tuple(start), tuple(goal)
+        if (start, goal) in self.paths:
+            return self.__getCached(start, goal)
+        if not self.isWalkable(start) or not self.isWalkable(goal):
+            return None
+        search = self.__find(start, goal)
+        try:
+            while True:
+                next(search)
+        except StopIteration as stop:
+            return stop.value
+    def request(self, start, goal, callback):
+        """
+        queue a path search. 'callback' is called with the path or 'none' by
+        'process()'. cached paths are handed over right away.
+        """
+        if (tuple(start), tuple(goal)) in self.paths:
+            callback(self.findPath(start, goal))
+        else:
+            self.requests.append((tuple(start), tuple(goal), callback))
+    def process(self, budget=2):# int
+        """
+        work on queued requests until 'budget' milliseconds are used up, so
+        many agents asking at once don't stall a frame. a search that isn't
+        done yet goes on with the next call. returns the number of requests
+        that are still waiting. call it with each game loop.
+        """
+        end = time.perf_counter() + budget / 1000
+
+        while self.requests and time.perf_counter() < end:
+            start, goal, callback = self.requests[0]
+            if self.search is None:
+                # answering cached and impossible requests right away
+                if (
+                    (start, goal) in self.paths or
+                    not self.isWalkable(start) or
+                    not self.isWalkable(goal)
+                ):
+                    self.requests.popleft()
+                    callback(self.findPath(start, goal))
+                    continue
+                self.search = self.__find(start, goal)
+            try:
+                while time.perf_counter() < end:
+                    next(self.search)
+            except StopIteration as stop:
+                self.search = None
+                self.requests.popleft()
+                callback(stop.value)
+
+        return len(self.requests)
+    def precompute(self):
+        """
+        measure the entrance distances of every cluster right away instead
+        of on the first search through it. use it on loading screens.
+        """
+        self.__measure([
+            cluster for cluster in self.__getAllClusters()
+            if cluster not in self.edges
+        ])
+    def update(self, cell):
+        """
+        read a changed cell from the grid again. the areas and entrances of
+        its cluster are found again and every cached path through it or its
+        neighbours is forgotten. a paused search is started over. the
+        collision grid calls this on changes. 'none' reads the whole grid
+        again and forgets every path.
+        """
+        if cell is None:
+            self.search = None
+            self.__build()
+            self.clear()
+            return
+        x, y = cell
+        walkable = not self.grid.mask[y, x] & self.bits
+        if walkable == self.walkable[y, x]:
+            return
+        self.walkable[y, x] = walkable
+        self.search = None
+        cx, cy = self.__getCluster(cell)
+        self.__label(self.__getBounds((cx, cy)))
+        self.__buildBorder((cx - 1, cy), (cx, cy))
+        self.__buildBorder((cx, cy), (cx + 1, cy))
+        self.__buildBorder((cx, cy - 1), (cx, cy))
+        self.__buildBorder((cx, cy), (cx, cy + 1))
+        clusters = [
+            (cx, cy),
+            (cx - 1, cy),
+            (cx + 1, cy),
+            (cx, cy - 1),
+            (cx, cy + 1)
+        ]
+        self.__buildNodes([
+            each for each in clusters
+            if 0 <= each[0] < self.clusters[0] and
+            0 <= each[1] < self.clusters[1]
+        ])
+        # forgetting paths that might be blocked or shorter now
+        clusters = set(clusters)
+        for key in list(self.paths):
+            if self.pathclusters[key] & clusters:
+                del self.paths[key]
+                del self.pathclusters[key]
+    def clear(self):
+        """forget every cached path."""
+        self.paths.clear()
+        self.pathclusters.clear()
+
+class FlowField:
+    """
+    walking distances and directions from every cell of a collision grid to
+    a single goal cell. the distances are found by a wavefront spreading
+    from the goal with numpy. each cell then points to its neighbour that is
+    closest to the goal, so any number of entities can look up their next
+    step without searching. usage:
+    field = FlowField(pathfinder.walkable, playercell)
+    dx, dy = field.getDirection(enemycell)
+    """
+    # (x, y) steps of the direction codes 1 to 4. 0 means standing still
+    steps = ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1))
+    def __init__(self, walkable, goal):
+        """
+        'walkable' 2d numpy array of bools. 'true' for cells that can be
+            walked on.
+        'goal' the cell (x, y) every direction leads to.
+        'distances' 2d numpy array of the walking distance of every cell to
+            the goal. -1 for cells that can't reach it.
+        'directions' 2d numpy array of direction codes. see 'steps'.
+        """
+        self.goal = tuple(goal)# tuple
+        self.size = (walkable.shape[1], walkable.shape[0])# tuple
+        self.distances = self.__integrate(walkable)# numpy.ndarray
+        self.directions = self.__getDirections()# numpy.ndarray
+    def __integrate(self, walkable):# numpy.ndarray
+        """
+        spread a wavefront from the goal over the walkable cells. only the
+        cells of the current front are looked at in each step.
+        """
+        w, h = self.size
+        flat = walkable.ravel()
+        distances = np.full(w * h, -1, dtype=np.int32)
+        x, y = self.goal
+        if not (0 <= x < w and 0 <= y < h) or not flat[y * w + x]:
+            return distances.reshape(h, w)
+        front = np.array([y * w + x])
+        distances[front] = 0
+        step = 0
+
+        while front.size:
+            step += 1
+            column = front % w
+            front = np.concatenate((
+                front[column < w - 1] + 1,
+                front[column > 0] - 1,
+                front[front < w * (h - 1)] + w,
+                front[front >= w] - w
+            ))
+            front = np.unique(front[flat[front] & (distances[front] == -1)])
+            distances[front] = step
+
+        return distances.reshape(h, w)
+    def __getDirections(self):# numpy.ndarray
+        """
+        return the direction code of every cell. each points to the
+        neighbour with the lowest distance.
+        """
+        h, w = self.distances.shape
+        # unreachable cells and the grid's border are never stepped on
+        far = np.iinfo(np.int32).max
+        padded = np.full((h + 2, w + 2), far, dtype=np.int32)
+        padded[1:-1, 1:-1] = np.where(self.distances >= 0, self.distances, far)
+        neighbours = np.stack((
+            padded[1:-1, 2:],
+            padded[1:-1, :-2],
+            padded[2:, 1:-1],
+            padded[:-2, 1:-1]
+        ))
+        directions = (np.argmin(neighbours, axis=0) + 1).astype(np.int8)
+        # the goal and cells that can't reach it stay where they are
+        directions[self.distances <= 0] = 0
+
+        return directions
+    def getDistance(self, cell):# int
+        """return the walking distance of a cell or -1 if it can't reach."""
+        x, y = cell
+        if 0 <= x < self.size[0] and 0 <= y < self.size[1]:
+            return int(self.distances[y, x])
+
+        return -1
+    def getDirection(self, cell):# tuple
+        """return the (x, y) step from a cell towards the goal."""
+        x, y = cell
+        if 0 <= x < self.size[0] and 0 <= y < self.size[1]:
+            return self.steps[self.directions[y, x]]
+
+        return self.steps[0]
+    def getNextCell(self, cell):# tuple
+        """return the cell to walk to next on the way to the goal."""
+        dx, dy = self.getDirection(cell)
+
+        return (cell[0] + dx, cell[1] + dy)
+class FlowFieldCache:
+    """
+    keeps the flow fields of the latest goals of a pathfinder. a field is
+    only built when its goal cell is asked for the first time, so chasing a
+    target rebuilds it only when the target enters a new cell. every field
+    is dropped as soon as the collision grid changes. usage:
+    fields = FlowFieldCache(pathfinder)
+    # with each game loop
+    field = fields.get((player.rect.centerx // 16, player.rect.centery // 16))
+    for enemy in enemies:
+        dx, dy = field.getDirection(
+            (enemy.rect.centerx // 16, enemy.rect.centery // 16)
+        )
+    """
+    default = {
+        "cachesize": 8
+    }
+    def __init__(self, pathfinder, config={}):
+        """
+        'pathfinder' pathfinder whose walkable cells the fields are built on.
+        'config' validated dict of properties.
+            'cachesize' number of fields that are kept.
+        'fields' least recently used cache of fields by their goal cell.
+        """
+        self.config = validateDict(config, self.default)# dict
+        self.pathfinder = pathfinder# pathfinder
+        self.fields = OrderedDict()# ordereddict
+        self.pathfinder.grid.listeners.append(self.update)
+    def __len__(self):# int
+        """return the number of cached fields."""
+        return len(self.fields)
+    def get(self, goal):# flowfield
+        """return the flow field towards that goal cell."""
+        goal = tuple(goal)
+        if goal in self.fields:
+            self.fields.move_to_end(goal)
+        else:
+            self.fields[goal] = FlowField(self.pathfinder.walkable, goal)
+            while len(self.fields) > self.config["cachesize"]:
+                self.fields.popitem(last=False)
+
+        return self.fields[goal]
+    def update(self, cell):
+        """
+        drop every field. the collision grid calls this on changes, after
+        the pathfinder has read the changed cell.
+        """
+        self.fields.clear()
@@ -0,0 +1,165 @@
+from .utils import validateDict
+import pygame as pg
+
+class WorldRenderer:
+    """
+    draws a map and the sprites walking on it through a camera. as long as
+    the camera doesn't move, only the screen areas sprites left or entered
+    are restored from the baked layers and drawn again. the whole screen is
+    only redrawn when the camera moves, zooms or the surface changes size.
+    hand the renderer to the app so it only pushes these areas to the
+    display. usage:
+    renderer = WorldRenderer(map, camera, [player])
+    app.renderer = renderer
+    # with each game loop
+    renderer.draw(app.display, map.animate())
+    app.update()
+    """
+    default = {
+        "background_color": (0, 0, 0)
+    }
+    def __init__(self, map, camera, sprites=[], config={}):
+        """
+        'map' map whose tile layers are drawn.
+        'camera' camera the map and sprites are drawn with.
+        'sprites' list of sprites drawn between the layers that overlap and
+            those that don't.
+        'config' validated dict of properties.
+            'background_color' fills the screen where there's no map.
+        'rects' dict of the last drawn screen rect of each sprite by its id.
+        'images' dict of the last drawn image of each sprite by its id.
+        'pending' list of screen rects that have to be restored with the next
+            draw. removed sprites leave their last rect here.
+        'state' camera position, zoom and surface size of the last full
+            redraw. 'none' forces a full redraw.
+        'dirty' list of screen rects that changed with the last draw. the
+            app empties it once they are pushed to the display.
+        """
+        self.config = validateDict(config, self.default)# dict
+        self.map = map# map
+        self.camera = camera# camera
+        self.sprites = list(sprites)# list
+        self.rects = {}# dict
+        self.images = {}# dict
+        self.pending = []# list
+        self.state = None# none / tuple
+        self.dirty = []# list
+    def add(self, sprite):
+        """add a sprite to be drawn on the map."""
+        if sprite not in self.sprites:
+            self.sprites.append(sprite)
+    def remove(self, sprite):
+        """
+        stop drawing a sprite. its last rect is restored with the next draw.
+        """
+        if sprite in self.sprites:
+            self.sprites.remove(sprite)
+            if id(sprite) in self.rects:
+                self.pending.append(self.rects.pop(id(sprite)))
+                del self.images[id(sprite)]
+    def invalidate(self):
+        """force a full redraw with the next draw."""
+        self.state = None
+    def __getImage(self, sprite):# pygame.surface
+        """return the image of a sprite scaled by the camera's zoom."""
+        zoom = self.camera.zoomfactor
+        if hasattr(sprite, "getZoomedImage"):
+            return sprite.getZoomedImage(zoom)
+        if zoom == 1:
+            return sprite.image
+
+        return pg.transform.scale(
+            sprite.image,
+            (
+                sprite.image.get_width() * zoom,
+                sprite.image.get_height() * zoom
+            )
+        )
+    def __getScreenRect(self, sprite, image):# pygame.rect
+        """return the screen rect a sprite's image is drawn to."""
+        rect = self.camera.getScreenRect(sprite.rect)
+
+        return pg.Rect(rect.topleft, image.get_size())
+    def __merge(self, rects):# list
+        """
+        merge overlapping rects, so no area is restored and drawn twice.
+        """
+        merged = []
+
+        for rect in rects:
+            rect = pg.Rect(rect)
+            # growing the rect as long as it swallows others
+            i = rect.collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+
+        return merged
+    def restore(self, surface, rect):
+        """
+        draw the map and every sprite inside of 'rect' to the surface. can be
+        used as background for 'pygame.sprite.Group.clear()'.
+        """
+        clip = surface.get_clip()
+        surface.set_clip(rect)
+        surface.fill(self.config["background_color"], rect)
+        self.map.drawVisible(surface, self.camera, False)
+        for sprite in self.sprites:
+            image = self.__getImage(sprite)
+            dest = self.__getScreenRect(sprite, image)
+            if dest.colliderect(rect):
+                surface.blit(image, dest)
+        self.map.drawVisible(surface, self.camera, True)
+        surface.set_clip(clip)
+    def draw(self, surface, changed=[]):# list
+        """
+        bring the surface up to date and return the list of changed screen
+        rects. call it with each game loop.
+        'changed' list of rects in map coordinates whose tiles have been
+            redrawn, like the ones 'map.animate()' returns.
+        """
+        state = (
+            tuple(self.camera.topleft),
+            self.camera.zoomfactor,
+            surface.get_size()
+        )
+        images = {}
+        rects = {}
+
+        for sprite in self.sprites:
+            image = self.__getImage(sprite)
+            images[id(sprite)] = image
+            rects[id(sprite)] = self.__getScreenRect(sprite, image)
+        # camera moved. everything has to be drawn again
+        if state != self.state:
+            self.state = state
+            self.pending = []
+            self.restore(surface, surface.get_rect())
+            self.dirty = [surface.get_rect()]
+        else:
+            dirty = self.pending
+            self.pending = []
+            for sprite in self.sprites:
+                key = id(sprite)
+                if (
+                    rects[key] != self.rects.get(key) or
+                    images[key] is not self.images.get(key)
+                ):
+                    dirty.append(rects[key])
+                    if key in self.rects:
+                        dirty.append(self.rects[key])
+            for rect in changed:
+                dirty.append(self.camera.getScreenRect(rect))
+            screen = surface.get_rect()
+            self.dirty = [
+                rect.clip(screen)
+                for rect in self.__merge(dirty)
+                if rect.colliderect(screen)
+            ]
+            for rect in self.dirty:
+                self.restore(surface, rect)
+        self.rects = rects
+        self.images = images
+
+        return self.dirty
@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+# the library is imported as 'go', whatever its folder is called
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "go" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "go",
+        os.path.join(ROOT, "__init__.py"),
+        submodule_search_locations=[ROOT]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["go"] = module
+    spec.loader.exec_module(module)
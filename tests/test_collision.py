@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from go.collision import CollisionGrid
+
+@pytest.fixture
+def grid():
+    mask = (np.random.default_rng(7).random((20, 20)) < 0.2).astype(np.uint8)
+    return CollisionGrid(mask, (16, 16))
+def corner_rays():
+    """45 degree rays and rays between cell corners."""
+    rng = np.random.default_rng(1)
+    starts, ends = [], []
+    for _ in range(2000):
+        start = rng.integers(0, 320, 2)
+        step = rng.integers(-200, 200)
+        starts.append(start)
+        ends.append(start + (step, rng.choice((-1, 1)) * step))
+    for _ in range(2000):
+        starts.append(rng.integers(0, 21, 2) * 16)
+        ends.append(rng.integers(0, 21, 2) * 16)
+    # rays ending exactly on a corner
+    starts += [(202, 54), (283, 180)]
+    ends += [(29, 227), (144, 224)]
+
+    return np.array(starts), np.array(ends)
+def test_raycast_many_matches_raycast_on_corners(grid):
+    starts, ends = corner_rays()
+    hits, cells, distances = grid.raycastMany(starts, ends)
+
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        found = grid.raycast(tuple(start), tuple(end))
+        if found is None:
+            assert not hits[i]
+            assert tuple(cells[i]) == (end[0] // 16, end[1] // 16)
+        else:
+            assert hits[i]
+            assert tuple(cells[i]) == found[0]
+            assert distances[i] == pytest.approx(found[1])
+def test_raycast_counts_the_end_cell(grid):
+    grid.setMask(np.zeros((20, 20), dtype=np.uint8))
+    grid.setCell((9, 14), 1)
+
+    assert grid.raycast((283, 180), (144, 224)) is not None
+    hits, cells, _ = grid.raycastMany([(283, 180)], [(144, 224)])
+    assert hits[0] and tuple(cells[0]) == (9, 14)
@@ -1,7 +1,8 @@
 # dependencies
-import json, os, re, ctypes, pprint
+import json, os, re, ctypes, pprint, base64, zlib, gzip, weakref
 import xml.etree.ElementTree as et
 import pygame as pg
+import numpy as np
 
 # centering window
 os.environ["SDL_VIDEO_CENTERED"] = "1"
@@ -16,7 +17,8 @@ PATH = {
     "maps": os.getcwd() + "\\assets\\maps",
     "tilesets": os.getcwd() + "\\assets\\tilesets",
     "entities": os.getcwd() + "\\assets\\entities",
-    "interface": os.getcwd() + "\\assets\\interface"
+    "interface": os.getcwd() + "\\assets\\interface",
+    "atlases": os.getcwd() + "\\assets\\atlases"
 }
 LIBPATH = {
     "noimage": PATH["sysimg"] + "\\noimage.png",
@@ -203,6 +205,17 @@ STYLE = {
         "button_margin": [0, 0, 0, 0],
         "options": ()
     },
+    "mini_map": {
+        "size": (150, 100),
+        "position": (0, 0),
+        "background_color": (0, 0, 0),
+        "background_hover": None,
+        "border": True,
+        "border_color": (20, 20, 30),
+        "border_size": 1,
+        "map": None,
+        "marker_color": (200, 200, 200)
+    },
     "panel": {
         "size": (150, 200),
         "position": (0, 0),
@@ -332,6 +345,37 @@ STYLE = {
     }
 }
 
+# 'tiled' stores flips of a tile in the highest bits of its tile id
+TILEFLAGS = {
+    "horizontal": 4,
+    "vertical": 2,
+    "diagonal": 1
+}
+TILEFLAGSHIFT = 29
+GIDMASK = 0x0FFFFFFF
+# collision categories as bits of a cell in a collision grid. tiles get them
+# from their 'block' property and from a 'collision' property naming one or
+# more categories like "water" or "wall, ledge"
+COLLISIONS = {
+    "block": 1,
+    "wall": 2,
+    "water": 4,
+    "ledge": 8
+}
+# images loaded by 'loadImage()'. the path is the key, the value is a list of
+# [surface, converted]
+IMAGES = {}
+# weak references to objects holding images that were prepared before a
+# display existed, in the order they were added. see 'holdImages()'
+HOLDERS = []
+# colors tried as colorkey for images with only fully transparent or opaque
+# pixels
+COLORKEYS = [
+    (255, 0, 255),
+    (0, 255, 255),
+    (255, 255, 0),
+    (1, 2, 3)
+]
 # rules for json parsing
 json_comments =  re.compile(
     "(^)?[^\S\n]*/(?:\*(.*?)\*/[^\S\n]*|/[^\n]*)($)?",
@@ -376,6 +420,9 @@ def loadAssets(path):# list
                     "type": "image",
                     "filepath": dirs[0]
                 }
+            # skipping compiled caches and other files
+            else:
+                continue
             # adding opened file-name to the dict as reference
             config.update({"filename": each})
             # appending to returning list
@@ -406,6 +453,43 @@ def loadJSON(path):# dict
         js.update({"filename": path.split("\\")[-1]})
 
     return js
+def loadCache(path):# dict / none
+    """
+    return a dict of arrays from a compiled cache file. returns 'none' if
+    there is no cache or if any of its source files changed since it was
+    written.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as file:
+            cache = {key: file[key] for key in file.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    # comparing modification times of all sources
+    for source, mtime in json.loads(str(cache["sources"])).items():
+        if not os.path.isfile(source) or os.path.getmtime(source) != mtime:
+            return None
+
+    return cache
+def saveCache(path, sources, **arrays):
+    """
+    write arrays to a compressed cache file together with the modification
+    times of the 'sources' it was built from. failing to write (like on
+    read-only asset folders) is silently ignored.
+    usage:
+    saveCache(path + ".npz", [jsonpath], grid=grid)
+    """
+    mtimes = {source: os.path.getmtime(source) for source in sources}
+    try:
+        with open(path, "wb") as file:
+            np.savez_compressed(
+                file,
+                sources=np.array(json.dumps(mtimes)),
+                **arrays
+            )
+    except OSError:
+        pass
 def loadXML(path):
     """
     returns a 'xml.etree.ElementTree.ElementTree' object read from a xml file
@@ -568,51 +652,90 @@ def convertRect(rect, parent):# pg.rect
             new_rect[1] = parent.height - new_rect[3]
 
     return pg.Rect(new_rect)
-def createTiledMap(config, tiles):# dict
+def createTiledMap(config, tiles, image=True):# dict
     """
     drawing tiles on a pygame surface and returning it in a dict together with
     a list of wall rects and other special blocks with their position.
+    'tiles' flat tile table with parallel property arrays. index 0 stands
+        for an empty cell.
+    'image' if 'false' no surface is created and 'image' is 'none'. the
+        tiles can still be drawn from 'cells'. see 'drawTiles()'.
+    'grid' the layer's tile ids as a 2d numpy array (rows, columns). flip
+        flags are stripped from the ids.
+    'flags' 2d numpy array of each cell's flip flags. see 'TILEFLAGS'.
+    'blockmask' 2d numpy array of bools. 'true' where a tile blocks.
+    'cells' tuple of numpy arrays (rows, columns, tile ids, flip flags) of
+        every visible tile, sorted by row and column.
     """
-    tilesize = tiles[0].image.get_rect().size
+    tilesize = config["tilesize"]
 
-    blocks = []
-    surface = pg.Surface(
-        (
-            config["width"] * tilesize[0],
-            config["height"] * tilesize[1]
-        ),
-        pg.SRCALPHA)
+    data = decodeTileData(
+        config["data"],
+        config.get("encoding"),
+        config.get("compression")
+    )
+    grid, flags = getFlags(
+        getGrid(data, (config["width"], config["height"]))
+    )
+    # drawing only visible tiles
+    rows, cols = np.nonzero(tiles.getMask("visible")[grid])
+    cells = (rows, cols, grid[rows, cols], flags[rows, cols])
+    surface = None
+    if image:
+        surface = pg.Surface(
+            (
+                config["width"] * tilesize[0],
+                config["height"] * tilesize[1]
+            ),
+            pg.SRCALPHA)
+        drawTiles(surface, tiles, cells, tilesize)
+    # add a block rect to blocklist for every tile that is not passable
+    blockmask = tiles.getMask("block")[grid]
+    blocks = [
+        pg.Rect((x * tilesize[0], y * tilesize[1]), tilesize)
+        for y, x in np.argwhere(blockmask).tolist()
+    ]
+    # set player-start position if there is a tile placed for that
     playerstart = None
-
-    i = 0
-    for row in range(config["height"]):
-        y = row * tilesize[1]
-        for line in range(config["width"]):
-            x = line * tilesize[0]
-
-            # only draw tile if area isn't empty
-            if config["data"][i] != 0:
-                tile = tiles[config["data"][i] - 1]
-                rect = pg.Rect((x, y), tile.image.get_rect().size)
-                # only draw if the tile is visible
-                if tile.visible is True:
-                    surface.blit(tile.image, (x, y))
-                # add a block rect to blocklist if tile is not passable
-                if tile.block:
-                    blocks.append(rect)
-
-                # set player-start position if there is a tile placed for that
-                if tile.name:
-                    if tile.name == "player_start":
-                        playerstart = rect
-
-            i += 1
+    starts = np.argwhere(tiles.getMask("name", "player_start")[grid])
+    if len(starts) > 0:
+        y, x = starts[-1].tolist()
+        playerstart = pg.Rect((x * tilesize[0], y * tilesize[1]), tilesize)
 
     return {
         "image": surface,
         "blocks": blocks,
-        "player_start": playerstart
+        "player_start": playerstart,
+        "grid": grid,
+        "flags": flags,
+        "blockmask": blockmask,
+        "cells": cells
     }
+def drawTiles(surface, tiles, cells, tilesize, offset=(0, 0)):# pg.surface
+    """
+    draw tiles to a surface with a single 'blits()'. flipped tiles are
+    transformed only once.
+    'cells' tuple of numpy arrays (rows, columns, tile ids, flip flags) like
+        'createTiledMap()' returns them.
+    'offset' pixel position the cell (0, 0) is drawn to.
+    """
+    rows, cols, gids, flags = cells
+    w, h = tilesize
+
+    surface.blits(
+        [
+            (tiles.getFrame(gid, flag), (x * w + offset[0], y * h + offset[1]))
+            for y, x, gid, flag in zip(
+                rows.tolist(),
+                cols.tolist(),
+                gids.tolist(),
+                flags.tolist()
+            )
+        ],
+        False
+    )
+
+    return surface
 def draw(object, destination, rect=None, blendmode=0):# pg.surface
     """
     drawing a single or multiple objects to the destination surface. then
@@ -861,7 +984,141 @@ def getDisplay(size, **kwargs):# pg.display.surface
             else:
                 display = pg.display.set_mode(size)
 
+    convertImages()
+
     return display
+def prepareImage(surface):# pg.surface
+    """
+    return the surface converted to the display's pixel format, so blitting
+    it doesn't need a conversion each time. without a display the surface is
+    returned as it is.
+    fully opaque images are stored without per-pixel alpha. images with only
+    fully transparent and opaque pixels get a colorkey, if there's a color
+    the image doesn't use. every other image keeps its per-pixel alpha.
+    """
+    if not pg.display.get_init() or not pg.display.get_surface():
+        return surface
+    # images without an alpha channel
+    if not surface.get_masks()[3]:
+        return surface.convert()
+    alpha = pg.surfarray.array_alpha(surface)
+    if alpha.min() == 255:
+        return surface.convert()
+    if np.any((alpha > 0) & (alpha < 255)):
+        return surface.convert_alpha()
+    image = surface.convert()
+    pixels = pg.surfarray.pixels2d(image)
+    used = pixels[alpha == 255]
+    for color in COLORKEYS:
+        key = image.map_rgb(color)
+        # the key must not appear in the image to be lossless
+        if not np.any(used == key):
+            pixels[alpha == 0] = key
+            del pixels
+            image.set_colorkey(color)
+            return image
+    del pixels
+
+    return surface.convert_alpha()
+def loadImage(path, reload=False):# pg.surface
+    """
+    load an image once and return it in the display's pixel format. see
+    'prepareImage()'. images loaded before a display exists are converted by
+    'convertImages()' as soon as 'getDisplay()' created one, so loading them
+    again afterwards returns the converted surface.
+    'reload' if 'true' the file is read again, like after it was edited.
+    """
+    if reload or path not in IMAGES:
+        image = pg.image.load(path)
+        converted = prepareImage(image)
+        IMAGES[path] = [converted, converted is not image]
+
+    return IMAGES[path][0]
+def holdImages(holder):
+    """
+    remember an object whose images can't be converted yet, because there
+    is no display. once 'getDisplay()' created one, 'convertImages()' calls
+    the holder's 'prepareImages()', so it can take the converted images or
+    build its surfaces again. holders are called in the order they were
+    added and aren't kept alive by this.
+    """
+    if not pg.display.get_init() or not pg.display.get_surface():
+        HOLDERS.append(weakref.ref(holder))
+def convertImages():
+    """
+    convert every image 'loadImage()' couldn't convert yet and let every
+    holder of images built before the display take them. see 'holdImages()'.
+    """
+    for path, (image, converted) in list(IMAGES.items()):
+        if not converted:
+            converted = prepareImage(image)
+            IMAGES[path] = [converted, converted is not image]
+    # holders added by loading threads meanwhile are kept for the next call
+    holders = HOLDERS[:]
+    del HOLDERS[:len(holders)]
+    for reference in holders:
+        holder = reference()
+        if holder is not None:
+            holder.prepareImages()
+def decodeTileData(data, encoding=None, compression=None):# list / ndarray
+    """
+    return the tile ids of a 'tiled'-layer or -chunk. csv-data is already a
+    list and returned as it is. base64-data is decoded and decompressed
+    ('zlib' or 'gzip') into an array of raw tile ids.
+    """
+    if type(data) is not str:
+        return data
+    raw = base64.b64decode(data)
+    if compression == "zlib":
+        raw = zlib.decompress(raw)
+    elif compression == "gzip":
+        raw = gzip.decompress(raw)
+    elif compression:
+        raise ValueError("unsupported tile data compression: " + compression)
+
+    return np.frombuffer(raw, dtype="<u4")
+def getFlags(grid):# tuple
+    """
+    split a grid of raw 'tiled' tile ids into a grid of plain tile ids and a
+    grid of flip flags (horizontal = 4, vertical = 2, diagonal = 1).
+    """
+    grid = np.asarray(grid, dtype=np.uint32)
+    flags = (grid >> TILEFLAGSHIFT).astype(np.uint8) & 7
+
+    return grid & GIDMASK, flags
+def getCells(mask, rect):# list
+    """
+    return a list of (x, y) cell positions where a 2d mask is 'true' inside
+    of 'rect'. 'rect' is given in cells and clipped to the mask.
+    """
+    rect = pg.Rect(rect).clip(pg.Rect(0, 0, mask.shape[1], mask.shape[0]))
+    area = mask[rect.top:rect.bottom, rect.left:rect.right]
+
+    return [
+        (x + rect.left, y + rect.top)
+        for y, x in np.argwhere(area).tolist()
+    ]
+def getChunks(surface, chunksize):# dict
+    """
+    return a dict of chunks cut out from a surface. the keys are the chunk
+    positions (x, y) counted in chunks. chunks without any visible pixels are
+    left out. the chunks are subsurfaces so drawing to the surface also
+    updates its chunks.
+    usage:
+    chunks = getChunks(layer, (512, 512)).
+    """
+    chunks = {}
+    rect = surface.get_rect()
+
+    for y in range(0, rect.height, chunksize[1]):
+        for x in range(0, rect.width, chunksize[0]):
+            area = pg.Rect((x, y), chunksize).clip(rect)
+            chunk = surface.subsurface(area)
+            # skipping empty chunks
+            if chunk.get_bounding_rect().size != (0, 0):
+                chunks[(x // chunksize[0], y // chunksize[1])] = chunk
+
+    return chunks
 def getFonts():# list
 	"""return a list with pygame fonts."""
 	return pygame.font.get_fonts()
@@ -891,11 +1148,86 @@ def getFrames(image, framesize):# list
 
             frames.append(clip)
     del(clip, rect)
+    # the image may be shared, like the ones from 'loadImage()'
+    image.set_clip(None)
 
     return frames
+def getGrid(data, size):# numpy.ndarray
+    """
+    return a 2d numpy array (rows, columns) from a flat list of tile ids like
+    'tiled' stores them. 'size' is the grid size in tiles (width, height).
+    """
+    return np.array(data, dtype=np.uint32).reshape(size[1], size[0])
+def createGrid(path, size):# numpy.memmap
+    """
+    create a grid file of uint32 tile ids on disk and return it as a
+    writable memory map. this way huge generated maps can be written without
+    ever holding the whole grid in memory. 'size' is (width, height).
+    usage:
+    grid = createGrid("world.npy", (8192, 8192))
+    grid[0:32, 0:32] = 1
+    grid.flush()
+    """
+    return np.lib.format.open_memmap(
+        path,
+        mode="w+",
+        dtype=np.uint32,
+        shape=(size[1], size[0])
+    )
+def loadGrid(path):# numpy.memmap
+    """
+    return a grid file as a read-only memory map. only the parts that are
+    accessed are read from disk.
+    """
+    return np.load(path, mmap_mode="r")
+def flipTile(image, flags):# pg.surface
+    """
+    return a transformed copy of a tile image depending on the 'tiled' flip
+    flags. like in 'tiled' the diagonal flip is applied first.
+    """
+    # a diagonal flip swaps x and y
+    if flags & TILEFLAGS["diagonal"]:
+        image = pg.transform.flip(pg.transform.rotate(image, 90), False, True)
+
+    return pg.transform.flip(
+        image,
+        bool(flags & TILEFLAGS["horizontal"]),
+        bool(flags & TILEFLAGS["vertical"])
+    )
 def getMouse():# tuple
     """returns pygame.mouse position."""
     return pg.mouse.get_pos()
+def mergeBlocks(blocks, tilesize):# list
+    """
+    return a list of rects where adjacent tile-sized block rects are greedily
+    merged into maximal rectangles. rows are extended to the right first,
+    then downwards as long as the whole row below is blocked too.
+    usage:
+    walls = mergeBlocks(map.blocks, (16, 16)).
+    """
+    w, h = tilesize
+    cells = set((rect.left // w, rect.top // h) for rect in blocks)
+    merged = []
+
+    for x, y in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+        # already part of a merged rect
+        if (x, y) not in cells:
+            continue
+        # extending to the right
+        width = 1
+        while (x + width, y) in cells:
+            width += 1
+        # extending downwards
+        height = 1
+        while all((x + i, y + height) in cells for i in range(width)):
+            height += 1
+        # taking the covered cells out
+        for j in range(height):
+            for i in range(width):
+                cells.discard((x + i, y + j))
+        merged.append(pg.Rect(x * w, y * h, width * w, height * h))
+
+    return merged
 def makeText(**kwargs):
     """returns a pg.surface with the text already blitten to it."""
     default = {